@@ -4,6 +4,10 @@ from pydantic import Field
 from pydantic_settings import BaseSettings
 
 Environment = Literal["local", "test", "dev", "stg", "prd"]
+EventDispatch = Literal["inline-serial", "inline-concurrent", "background"]
+CacheSerializer = Literal["json", "orjson", "msgpack"]
+CacheCompression = Literal["none", "zstd", "lz4"]
+PublisherBufferPolicy = Literal["block", "drop-oldest", "spill"]
 
 
 class BasesConfig(BaseSettings):
@@ -13,6 +17,100 @@ class BasesConfig(BaseSettings):
     CACHE_TTL: int | None = Field(
         description="TTL for key expiration in cache", default=None
     )
+    CACHE_STALE_TTL: int = Field(
+        description="Seconds a query result past CACHE_TTL is still served while it refreshes",
+        default=60,
+    )
+    CACHE_EARLY_REFRESH_BETA: float = Field(
+        description="How eagerly cached queries refresh before CACHE_TTL, 0 disables it",
+        default=1.0,
+    )
+    CACHE_SERIALIZER: CacheSerializer = Field(
+        description="Serializer for cached values, orjson and msgpack must be installed",
+        default="json",
+    )
+    CACHE_COMPRESSION: CacheCompression = Field(
+        description="Compression for large cached values, zstandard or lz4 must be installed",
+        default="none",
+    )
+    CACHE_COMPRESSION_THRESHOLD: int = Field(
+        description="Cached values of at least this many bytes are compressed",
+        default=1024,
+    )
+    CACHE_INSTRUMENTED: bool = Field(
+        description="Export cache latencies, hits, misses and value sizes as metrics",
+        default=False,
+    )
+    CACHE_METRICS_PREFIX_DEPTH: int = Field(
+        description="Number of `:` separated key parts cache hits and misses are grouped by",
+        default=3,
+    )
+    CACHE_TIERED: bool = Field(
+        description="Serve hot cache keys from an in-process tier in front of redis",
+        default=False,
+    )
+    CACHE_LOCK: bool = Field(
+        description="Take a cache lock so only one pod recomputes an expired query",
+        default=False,
+    )
+    CACHE_LOCK_TIMEOUT: float = Field(
+        description="Seconds a query recompute lock is held at most", default=5
+    )
+    BLOOM_CAPACITY: int = Field(
+        description="Expected number of user emails in the bloom filter",
+        default=1_000_000,
+    )
+    BLOOM_ERROR_RATE: float = Field(
+        description="Bloom filter false positive rate at capacity", default=0.01
+    )
+    BLOOM_SHARED: bool = Field(
+        description="Share the user email bloom filter between pods through redis",
+        default=False,
+    )
+    NATS_JETSTREAM: bool = Field(
+        description="Publish domain events to JetStream and wait for them to be stored",
+        default=False,
+    )
+    PUBLISHER_BUFFERED: bool = Field(
+        description="Queue published events and send them from a background flusher",
+        default=False,
+    )
+    PUBLISHER_BUFFER_SIZE: int = Field(
+        description="Max events waiting in the publish buffer", default=10_000, ge=1
+    )
+    PUBLISHER_BUFFER_POLICY: PublisherBufferPolicy = Field(
+        description="What publishing does once the buffer is full", default="block"
+    )
+    PUBLISHER_BUFFER_TIMEOUT: float = Field(
+        description="Seconds the block policy waits for room before failing",
+        default=1.0,
+        ge=0,
+    )
+    PUBLISHER_BUFFER_SPILL_PATH: str = Field(
+        description="File the spill policy appends events to, keep it on a volume",
+        default="publisher_spill.jsonl",
+    )
+    PUBLISHER_BUFFER_BATCH_SIZE: int = Field(
+        description="Max events the publish buffer flushes at once", default=500, ge=1
+    )
+    UOW_OUTBOX: bool = Field(
+        description="Store domain events in the outbox table instead of publishing on commit",
+        default=False,
+    )
+    UOW_EVENT_DISPATCH: EventDispatch = Field(
+        description="How domain events are published after a Uow commit",
+        default="inline-serial",
+    )
+    UOW_EVENT_BATCH_SIZE: int = Field(
+        description="Max domain events per publish_many call, larger commits are "
+        "sent in batches of this size one after the other",
+        default=100,
+    )
+    UOW_MAX_IN_FLIGHT_EVENTS: int = Field(
+        description="Max domain events published in the background at once across "
+        "commits, commits wait for room before handing theirs over",
+        default=1000,
+    )
     # Keycloak
     KEYCLOAK_SERVER_URL: str = Field(
         description="URL for keycloak server", default="http://keycloak:8080/"
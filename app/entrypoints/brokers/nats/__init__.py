@@ -0,0 +1,36 @@
+import asyncio
+import signal
+
+from kink import di
+
+from app.config import config
+from app.infra import close_connections, init_connections
+from app.infra.nats.connection import NatsConnection
+from app.logger import logger
+
+from .handlers import consumer
+
+
+async def main():
+    await init_connections()
+    # the local infra runs without a broker, the consumer connects its own
+    connection = di[NatsConnection]
+    if config.ENVIRONMENT == "local":
+        await connection.connect()
+
+    task = asyncio.create_task(consumer.run(connection.nc))
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # lets the batches being handled finish and ack
+        loop.add_signal_handler(sig, consumer.stop)
+
+    logger.info("Nats consumer started 🚀")
+
+    try:
+        await task
+    finally:
+        # cleanup on shutdown
+        if config.ENVIRONMENT == "local":
+            await connection.close()
+        await close_connections()
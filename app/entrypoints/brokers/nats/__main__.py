@@ -0,0 +1,5 @@
+import asyncio
+
+from . import main
+
+asyncio.run(main())
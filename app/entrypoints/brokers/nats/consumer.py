@@ -0,0 +1,221 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from typing import Any, Hashable
+
+from nats.aio.client import Client
+from nats.aio.msg import Msg
+from nats.errors import TimeoutError
+from nats.js import JetStreamContext
+from nats.js.errors import NotFoundError
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from app.domain.event import Payload
+from app.logger import logger
+
+type Handler = Callable[[Payload], Awaitable[Any]]
+type OrderingKey = Callable[[Payload], Hashable]
+
+RESTART_DELAY = 1.0
+
+
+class NatsConsumerConfig(BaseSettings):
+    NATS_CONSUMER_STREAM: str = Field(
+        description="JetStream stream holding the consumed subjects", default="events"
+    )
+    NATS_CONSUMER_DURABLE: str = Field(
+        description="Durable consumer name prefix, shared by the worker replicas",
+        default="service_name",
+    )
+    NATS_CONSUMER_BATCH_SIZE: int = Field(
+        description="Max messages fetched per pull", default=256
+    )
+    NATS_CONSUMER_CONCURRENCY: int = Field(
+        description="Max handlers running at once", default=64
+    )
+    NATS_CONSUMER_FETCH_TIMEOUT: float = Field(
+        description="Seconds a pull waits for messages", default=1.0
+    )
+    NATS_CONSUMER_NAK_DELAY: float = Field(
+        description="Seconds before a failed message is redelivered, doubled on "
+        "every further delivery",
+        default=1.0,
+    )
+    NATS_CONSUMER_MAX_NAK_DELAY: float = Field(
+        description="Max seconds before a failed message is redelivered", default=60
+    )
+    NATS_CONSUMER_MAX_DELIVER: int = Field(
+        description="Deliveries of a failing message before it is terminated",
+        default=10,
+    )
+
+
+def decode(data: bytes) -> Payload:
+    # publishers send dicts as json and strings as is
+    try:
+        payload = json.loads(data)
+    except ValueError:
+        return data.decode()
+    return payload if isinstance(payload, dict) else data.decode()
+
+
+class NatsConsumer:
+    """Pull consumes JetStream subjects in batches and runs their handlers
+    Messages of a fetched batch sharing an ordering key are handled one after
+    the other, the rest concurrently up to `concurrency` handlers at once
+    Acks are sent once a batch is handled and flushed together, failed
+    messages and the ones queued behind them are nak'd for a delayed
+    redelivery. Ordering only holds within a batch: later messages of the key
+    may be fetched and handled before the redelivered ones
+    Undecodable messages and ones failing `max_deliver` times are terminated
+    """
+
+    handlers: dict[str, tuple[Handler, OrderingKey | None]]
+
+    def __init__(
+        self,
+        stream: str | None = None,
+        durable: str | None = None,
+        batch_size: int | None = None,
+        concurrency: int | None = None,
+        fetch_timeout: float | None = None,
+        nak_delay: float | None = None,
+        max_nak_delay: float | None = None,
+        max_deliver: int | None = None,
+    ):
+        config = NatsConsumerConfig()
+        self.handlers = {}
+        self.stream = stream or config.NATS_CONSUMER_STREAM
+        self.durable = durable or config.NATS_CONSUMER_DURABLE
+        self.batch_size = batch_size or config.NATS_CONSUMER_BATCH_SIZE
+        self.concurrency = concurrency or config.NATS_CONSUMER_CONCURRENCY
+        self.fetch_timeout = fetch_timeout or config.NATS_CONSUMER_FETCH_TIMEOUT
+        self.nak_delay = nak_delay or config.NATS_CONSUMER_NAK_DELAY
+        self.max_nak_delay = max_nak_delay or config.NATS_CONSUMER_MAX_NAK_DELAY
+        self.max_deliver = max_deliver or config.NATS_CONSUMER_MAX_DELIVER
+        self._semaphore: asyncio.Semaphore | None = None
+        self._stopping: asyncio.Event | None = None
+
+    def handler(self, subject: str, key: OrderingKey | None = None):
+        """Register the decorated function for `subject`
+        `key` maps a payload to its ordering key, unkeyed messages aren't ordered
+        """
+
+        def decorator(fn: Handler) -> Handler:
+            self.handlers[subject] = (fn, key)
+            return fn
+
+        return decorator
+
+    async def run(self, nc: Client):
+        """Consume every registered subject until `stop` is called"""
+        js = nc.jetstream()
+        await self._ensure_stream(js)
+        self._stopping = asyncio.Event()
+        await asyncio.gather(
+            *[self._consume_forever(nc, js, subject) for subject in self.handlers]
+        )
+
+    def stop(self):
+        """Stop pulling, batches being handled are finished and acked first"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def handle_batch(self, subject: str, messages: list[Msg]):
+        """Handle messages pulled for the registered `subject`"""
+        handler, key = self.handlers[subject]
+        # a lane per ordering key, unkeyed messages get their own
+        lanes: dict[Hashable, list[tuple[Msg, Payload]]] = {}
+        for msg in messages:
+            try:
+                payload = decode(msg.data)
+                lane = key(payload) if key else object()
+                lanes.setdefault(lane, []).append((msg, payload))
+            except Exception as e:
+                # redelivering won't make it readable
+                logger.error(f"Terminating unreadable {msg.subject} event: {e}")
+                await msg.term()
+
+        await asyncio.gather(
+            *[self._handle_lane(handler, lane) for lane in lanes.values()]
+        )
+
+    # Internals
+    async def _ensure_stream(self, js: JetStreamContext):
+        try:
+            info = await js.stream_info(self.stream)
+        except NotFoundError:
+            await js.add_stream(name=self.stream, subjects=list(self.handlers))
+            return
+
+        # subjects of other publishers are kept, pull_subscribe fails on ones
+        # the stream doesn't hold
+        subjects = info.config.subjects or []
+        missing = [subject for subject in self.handlers if subject not in subjects]
+        if missing:
+            info.config.subjects = subjects + missing
+            await js.update_stream(info.config)
+
+    async def _consume_forever(self, nc: Client, js: JetStreamContext, subject: str):
+        # a failing subject is restarted without stopping the others
+        assert self._stopping is not None
+        while not self._stopping.is_set():
+            try:
+                await self._consume(nc, js, subject)
+            except Exception as e:
+                logger.error(f"Consuming {subject} failed, restarting: {e}")
+                await asyncio.sleep(RESTART_DELAY)
+
+    async def _consume(self, nc: Client, js: JetStreamContext, subject: str):
+        assert self._stopping is not None
+        # durable names can't hold subject tokens separators or wildcards
+        durable = f"{self.durable}_{subject}".translate(str.maketrans(".*>", "__-"))
+        subscription = await js.pull_subscribe(
+            subject, durable=durable, stream=self.stream
+        )
+        try:
+            while not self._stopping.is_set():
+                try:
+                    messages = await subscription.fetch(
+                        self.batch_size, timeout=self.fetch_timeout
+                    )
+                except TimeoutError:
+                    continue
+
+                await self.handle_batch(subject, messages)
+                # acks are buffered publishes, one round trip sends them all
+                await nc.flush()
+        finally:
+            await subscription.unsubscribe()
+
+    async def _handle_lane(self, handler: Handler, lane: list[tuple[Msg, Payload]]):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        for i, (msg, payload) in enumerate(lane):
+            try:
+                async with self._semaphore:
+                    await handler(payload)
+            except Exception as e:
+                logger.error(f"Failed to handle {msg.subject} event: {e}")
+                delivered = msg.metadata.num_delivered
+                # keep the lane ordered, later messages wait for the redelivery
+                waiting, delay = lane[i:], self._nak_delay(delivered)
+                if delivered >= self.max_deliver:
+                    logger.error(
+                        f"Terminating {msg.subject} event after {delivered} deliveries"
+                    )
+                    await msg.term()
+                    waiting, delay = lane[i + 1 :], None
+
+                for failed, _ in waiting:
+                    await failed.nak(delay=delay)
+                return
+
+            await msg.ack()
+
+    def _nak_delay(self, delivered: int) -> float:
+        # exponential backoff, the exponent is capped so it can't overflow
+        delay = self.nak_delay * 2 ** min(delivered - 1, 32)
+        return min(delay, self.max_nak_delay)
@@ -0,0 +1,11 @@
+from app.domain.event import Payload
+from app.logger import logger
+
+from .consumer import NatsConsumer
+
+consumer = NatsConsumer()
+
+
+@consumer.handler("DomainThingHappened", key=lambda payload: payload["email"])
+async def domain_thing_happened(payload: Payload):
+    logger.info(f"Domain thing happened: {payload}")
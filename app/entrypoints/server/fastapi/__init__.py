@@ -1,11 +1,14 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
+from kink import di
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
 from app.infra import close_connections, init_connections
 from app.logger import logger
+from app.services.user import UserEmailFilterService
 
 from .handlers import register_handlers
 from .middlewares import register_middlewares
@@ -31,14 +34,28 @@ async def lifespan(app: FastAPI):
 
     app.include_router(router, prefix=config.URL_PREFIX)
 
+    # the filter answers "maybe" until loaded, no need to hold startup
+    load_email_filter = asyncio.create_task(_load_email_filter())
+
     logger.info("Server started 🚀")
 
     yield
 
     # cleanup on shutdown
+    load_email_filter.cancel()
+    with suppress(asyncio.CancelledError):
+        await load_email_filter
     await close_connections()
 
 
+async def _load_email_filter():
+    try:
+        await di[UserEmailFilterService].load()
+        logger.info("User email filter loaded")
+    except Exception as e:
+        logger.error(f"Failed to load user email filter: {e}")
+
+
 app = FastAPI(lifespan=lifespan)
 register_handlers(app)
 register_middlewares(app)
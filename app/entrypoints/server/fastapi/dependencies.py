@@ -11,12 +11,28 @@ class Pagination(TypedDict):
     limit: int
 
 
+class CursorPagination(TypedDict):
+    after: str | None
+    limit: int
+
+
 def pagination(
-    skip: Annotated[int, Query(ge=0)], limit: Annotated[int, Query(le=500)]
+    skip: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
 ) -> Pagination:
     return {"skip": skip, "limit": limit}
 
 
+def cursor_pagination(
+    after: Annotated[
+        str | None,
+        Query(description="Cursor of the previous page, empty for the first page"),
+    ] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> CursorPagination:
+    return {"after": after, "limit": limit}
+
+
 async def validate_token(
     auth: Annotated[Auth, Depends(lambda: di[Auth])],
     authorization: Annotated[str, Header()],
@@ -6,6 +6,7 @@ from app.services.errors import (
     NoResourceException,
     ResourceExistsException,
     ServiceException,
+    ServiceUnavailableException,
     ValidationError,
 )
 
@@ -16,6 +17,9 @@ def register_handlers(app: FastAPI):
     app.add_exception_handler(
         ResourceExistsException, service_resource_exists_error_handler
     )
+    app.add_exception_handler(
+        ServiceUnavailableException, service_unavailable_error_handler
+    )
     app.add_exception_handler(ServiceException, service_base_error_handler)
     app.add_exception_handler(Exception, base_error_handler)
 
@@ -40,6 +44,14 @@ async def service_resource_exists_error_handler(
     )
 
 
+async def service_unavailable_error_handler(
+    _: Request, exception: ServiceUnavailableException
+):
+    return JSONResponse(
+        status_code=503, content=jsonable_encoder(exception.serialize())
+    )
+
+
 async def service_base_error_handler(_: Request, exception: ServiceException):
     return JSONResponse(
         status_code=400, content=jsonable_encoder(exception.serialize())
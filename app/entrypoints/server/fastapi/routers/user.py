@@ -2,11 +2,13 @@ from typing import Annotated
 
 from classy_fastapi import Routable, get, post
 from fastapi import Depends
+from fastapi.responses import StreamingResponse
 from kink import di, inject
 
+from app.services.ports.query import UsersPage
 from app.services.user import UserCrudService, UserViewService, dtos
 
-from ..dependencies import Pagination, pagination
+from ..dependencies import CursorPagination, Pagination, cursor_pagination, pagination
 
 
 @inject()
@@ -19,13 +21,36 @@ class UserRoutes(Routable):
         self.crud_service = crud_service
         self.view_service = view_service
 
-    @get("/")
-    async def list_users(self, commons: Annotated[Pagination, Depends(pagination)]):
+    @get("/", response_model=list[str])
+    async def list_users(
+        self, commons: Annotated[Pagination, Depends(pagination)]
+    ) -> list[str]:
         return await self.view_service.list_users(commons["skip"], commons["limit"])
 
+    @get("/pages", response_model=UsersPage)
+    async def list_users_page(
+        self, commons: Annotated[CursorPagination, Depends(cursor_pagination)]
+    ) -> UsersPage:
+        # keyset pagination, costs the same on every page
+        return await self.view_service.list_users_after(
+            commons["after"], commons["limit"]
+        )
+
+    @get("/export")
+    async def export_users(self):
+        return StreamingResponse(
+            self.view_service.export_users(), media_type="application/x-ndjson"
+        )
+
     @post("/")
     async def create_user(self, create_user: dtos.CreateUser):
         return await self.crud_service.create_user(create_user)
 
+    @post(":batch")
+    async def create_users(
+        self, create_users: dtos.CreateUsers
+    ) -> list[dtos.CreatedUser]:
+        return await self.crud_service.create_users(create_users)
+
 
 user_routes = di[UserRoutes]
@@ -0,0 +1,46 @@
+import asyncio
+import signal
+
+from kink import di
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from app.infra import close_connections, init_connections
+from app.logger import logger
+from app.services.ports import OutboxRelay
+
+
+class OutboxRelayConfig(BaseSettings):
+    OUTBOX_BATCH_SIZE: int = Field(
+        description="Max events relayed per outbox transaction", default=500
+    )
+    OUTBOX_POLL_INTERVAL: float = Field(
+        description="Seconds to wait for new events once the outbox is drained",
+        default=1.0,
+    )
+
+
+config = OutboxRelayConfig()
+
+
+async def main():
+    await init_connections()
+
+    relay = di[OutboxRelay]
+    task = asyncio.create_task(
+        relay.run(config.OUTBOX_BATCH_SIZE, config.OUTBOX_POLL_INTERVAL)
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+
+    logger.info("Outbox relay started 🚀")
+
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        # cleanup on shutdown
+        await close_connections()
@@ -1,27 +1,89 @@
 # ruff: noqa: F403
+from typing import cast
+
 from kink import di, inject
 
 from app.config import config
+from app.services.dispatcher import EventDispatcher
+from app.services.ports.bloom import BloomFilter
+from app.services.ports.cache import Cache
+from app.services.ports.metrics import ObservabilityMetrics
+from app.services.ports.outbox import OutboxRelay
+from app.services.ports.publisher import Publisher
 
+from .buffered.publisher import BufferedPublisher
 from .connection import Connection
 
 # Initialize Infra
 match config.ENVIRONMENT:
     case "local":
         from .memory.auth import *
+        from .memory.bloom import *
         from .memory.cache import *  # noqa: F403
         from .memory.metrics import *
         from .memory.publisher import *
+        from .sqlalchemy.outbox import *
         from .sqlalchemy.query import *
         from .sqlalchemy.uow import *
+
+        from .memory.cache import InMemoryCache
+        from .memory.publisher import InMemoryEventPublisher
+
+        cache_service: type[Cache] = InMemoryCache
+        publisher_service: type[Publisher] = InMemoryEventPublisher
     case _:
         from .keycloak.auth import *
+        from .memory.bloom import *
         from .nats.publisher import *
         from .prometheus.metrics import *
         from .redis.cache import *
+        from .sqlalchemy.outbox import *
         from .sqlalchemy.query import *
         from .sqlalchemy.uow import *
 
+        from .nats.publisher import NatsEventPublisher
+        from .redis.cache import RedisCache
+
+        cache_service = RedisCache
+        if config.CACHE_TIERED:
+            from .redis.tiered import TieredCache
+
+            cache_service = TieredCache
+
+        publisher_service = NatsEventPublisher
+        if config.NATS_JETSTREAM:
+            from .nats.jetstream import JetStreamEventPublisher
+
+            publisher_service = JetStreamEventPublisher
+
+        if config.BLOOM_SHARED:
+            from .redis.bloom import RedisBloomFilter
+
+            di[BloomFilter] = lambda di: di[RedisBloomFilter]
+
+if config.CACHE_INSTRUMENTED:
+    from .instrumented.cache import InstrumentedCache
+
+    di[Cache] = lambda di: InstrumentedCache(
+        di[cache_service], di[ObservabilityMetrics]
+    )
+else:
+    di[Cache] = lambda di: di[cache_service]
+
+if config.PUBLISHER_BUFFERED:
+    from .sqlalchemy.connection import SqlConnection
+    from .sqlalchemy.outbox import SqlAlchemyOutboxRelay
+
+    di[Publisher] = lambda di: BufferedPublisher(
+        di[publisher_service], di[ObservabilityMetrics]
+    )
+    # the relay deletes rows once published, it must wait on the broker itself
+    di[OutboxRelay] = lambda di: SqlAlchemyOutboxRelay(
+        di[SqlConnection], di[publisher_service], di[ObservabilityMetrics]
+    )
+else:
+    di[Publisher] = lambda di: di[publisher_service]
+
 
 @inject()
 class InfraInitializer:
@@ -34,7 +96,15 @@ class InfraInitializer:
         for connection in self.connections:
             await connection.connect()
 
+        # an idle pod must still redeliver what a previous one spilled
+        if config.PUBLISHER_BUFFERED:
+            cast(BufferedPublisher, di[Publisher]).start()
+
     async def close_connections(self, cleanup: bool = False):
+        # publish pending domain events while the broker is still connected
+        await EventDispatcher.flush()
+        await BufferedPublisher.flush()
+
         for connection in self.connections:
             await connection.close(cleanup)
 
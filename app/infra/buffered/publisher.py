@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+from collections import deque
+from weakref import WeakSet
+
+from app.config import PublisherBufferPolicy, config
+from app.logger import logger
+from app.services.errors import ServiceUnavailableException
+from app.services.ports import ObservabilityMetrics, Publisher
+from app.services.ports.publisher import Events, Payload
+
+MAX_BACKOFF = 30.0
+
+
+class BufferedPublisher(Publisher):
+    """Queues events for a background flusher so a slow broker doesn't hold up
+    callers, `inner` gets them in batches and failed batches are retried
+    Once PUBLISHER_BUFFER_SIZE events wait, `block` waits up to
+    PUBLISHER_BUFFER_TIMEOUT for room for the whole batch, or an empty queue
+    if it is larger, and queues none of it on timeout, `drop-oldest` discards
+    the oldest queued event and `spill` appends to a file replayed once the
+    queue drained, so spilled events arrive after the ones queued meanwhile
+    """
+
+    # shared so shutdown can drain every buffer
+    _instances: WeakSet["BufferedPublisher"] = WeakSet()
+
+    inner: Publisher
+    metrics: ObservabilityMetrics
+    queue: deque[Events]
+
+    def __init__(
+        self,
+        inner: Publisher,
+        metrics: ObservabilityMetrics,
+        size: int | None = None,
+        policy: PublisherBufferPolicy | None = None,
+        timeout: float | None = None,
+        spill_path: str | None = None,
+        batch_size: int | None = None,
+    ):
+        self.inner = inner
+        self.metrics = metrics
+        self.queue = deque()
+        self.size = config.PUBLISHER_BUFFER_SIZE if size is None else size
+        self.policy = config.PUBLISHER_BUFFER_POLICY if policy is None else policy
+        self.timeout = config.PUBLISHER_BUFFER_TIMEOUT if timeout is None else timeout
+        self.spill_path = (
+            config.PUBLISHER_BUFFER_SPILL_PATH if spill_path is None else spill_path
+        )
+        self.batch_size = (
+            config.PUBLISHER_BUFFER_BATCH_SIZE if batch_size is None else batch_size
+        )
+        self._in_flight: list[Events] = []
+        self._pending = asyncio.Event()
+        self._room = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._instances.add(self)
+
+    async def publish(self, channel: str, payload: Payload):
+        await self.publish_many([Events(channel=channel, payload=payload)])
+
+    async def publish_many(self, events: list[Events]):
+        if not events:
+            return
+
+        self._ensure_flushing()
+        if self.policy == "block":
+            # all or nothing, so callers retrying on timeout don't duplicate
+            await self._wait_for_room(len(events))
+            self.queue.extend(events)
+        else:
+            for event in events:
+                if len(self.queue) >= self.size and not self._make_room(event):
+                    continue
+                self.queue.append(event)
+
+        self._pending.set()
+        self._idle.clear()
+        self._report_depth()
+
+    def start(self):
+        """Start the flusher, replays events a previous process spilled without
+        waiting for a publish, called on startup
+        """
+        self._ensure_flushing()
+
+    @classmethod
+    async def flush(cls, timeout: float = 10):
+        """Drain every buffer, called on shutdown"""
+        await asyncio.gather(*[buffer.close(timeout) for buffer in cls._instances])
+
+    async def close(self, timeout: float = 10):
+        """Wait up to `timeout` for the queue to drain, then stop the flusher
+        Events left are spilled with the spill policy and dropped otherwise
+        """
+        if self._flusher is None:
+            return
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            pass
+
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+
+        left = self._in_flight + list(self.queue)
+        self._in_flight = []
+        self.queue.clear()
+        self._report_depth()
+        if not left:
+            return
+
+        if self.policy == "spill":
+            self._spill(left)
+            return
+
+        logger.error(f"Dropped {len(left)} buffered events on shutdown")
+        self.metrics.increment(
+            "publisher_buffer_dropped_total", len(left), {"reason": "shutdown"}
+        )
+
+    # Internals
+    def _make_room(self, event: Events) -> bool:
+        # returns whether `event` may still be queued
+        match self.policy:
+            case "drop-oldest":
+                self.queue.popleft()
+                self.metrics.increment(
+                    "publisher_buffer_dropped_total", labels={"reason": "full"}
+                )
+                return True
+            case _:
+                self._spill([event])
+                return False
+
+    async def _wait_for_room(self, count: int):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        while len(self.queue) + min(count, self.size) > self.size:
+            self._room.clear()
+            try:
+                await asyncio.wait_for(self._room.wait(), deadline - loop.time())
+            except TimeoutError:
+                self.metrics.increment(
+                    "publisher_buffer_dropped_total",
+                    count,
+                    {"reason": "timeout"},
+                )
+                raise ServiceUnavailableException("Event publishing is backed up")
+
+    def _ensure_flushing(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def _flush_forever(self):
+        while True:
+            if not self.queue:
+                if os.path.exists(self._replay_path) or os.path.exists(self.spill_path):
+                    await self._replay()
+                    continue
+
+                self._idle.set()
+                self._pending.clear()
+                await self._pending.wait()
+                continue
+
+            count = min(len(self.queue), self.batch_size)
+            self._in_flight = [self.queue.popleft() for _ in range(count)]
+            self._room.set()
+            self._report_depth()
+            await self._publish(self._in_flight)
+            self._in_flight = []
+
+    async def _publish(self, events: list[Events]):
+        # retried until it goes through, the queue fills up meanwhile
+        backoff = 0.1
+        while True:
+            try:
+                await self.inner.publish_many(events)
+                return
+            except Exception as e:
+                logger.error(f"Failed to publish {len(events)} buffered events: {e}")
+                self.metrics.increment("publisher_buffer_errors_total")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    @property
+    def _replay_path(self) -> str:
+        return f"{self.spill_path}.replay"
+
+    def _spill(self, events: list[Events]):
+        # appends are small and buffered by the os, not worth a thread
+        with open(self.spill_path, "a") as file:
+            file.writelines(json.dumps(event) + "\n" for event in events)
+        self.metrics.increment("publisher_buffer_spilled_total", len(events))
+
+    async def _replay(self):
+        # moved aside so new spills go to a fresh file, left over by a crash
+        # it is replayed on the next start
+        if not os.path.exists(self._replay_path):
+            os.replace(self.spill_path, self._replay_path)
+
+        with open(self._replay_path) as file:
+            batch: list[Events] = []
+            for line in file:
+                batch.append(json.loads(line))
+                if len(batch) == self.batch_size:
+                    await self._publish(batch)
+                    batch = []
+            if batch:
+                await self._publish(batch)
+
+        os.remove(self._replay_path)
+
+    def _report_depth(self):
+        self.metrics.set("publisher_buffer_depth", len(self.queue))
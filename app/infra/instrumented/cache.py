@@ -0,0 +1,97 @@
+from collections.abc import Awaitable
+from time import perf_counter
+from typing import Mapping
+
+from app.config import config
+from app.services.ports import Cache, ObservabilityMetrics
+from app.services.ports.cache import CachePipeline, CacheValue
+
+
+class InstrumentedCache(Cache):
+    """Wraps any Cache to export operation latencies, hits and misses per key
+    prefix and value sizes to `metrics`
+    Prefixes are the first CACHE_METRICS_PREFIX_DEPTH `:` separated parts of
+    the key, `__port:Query:list_users` for query keys
+    """
+
+    inner: Cache
+    metrics: ObservabilityMetrics
+
+    def __init__(self, inner: Cache, metrics: ObservabilityMetrics):
+        self.inner = inner
+        self.metrics = metrics
+        # values are encoded the way the wrapped cache reads them
+        self.codec = inner.codec
+        self._depth = config.CACHE_METRICS_PREFIX_DEPTH
+
+    async def get(self, key: str) -> CacheValue | None:
+        value = await self._timed("get", self.inner.get(key))
+        self._record_lookup(key, value)
+        return value
+
+    async def multi_get(self, keys: list[str]) -> list[CacheValue | None]:
+        values = await self._timed("multi_get", self.inner.multi_get(keys))
+        for key, value in zip(keys, values):
+            self._record_lookup(key, value)
+        return values
+
+    async def set(self, key: str, value: CacheValue, ttl: int | None = None) -> bool:
+        self._record_size("set", key, value)
+        return await self._timed("set", self.inner.set(key, value, ttl))
+
+    async def multi_set(
+        self, values: Mapping[str, CacheValue], ttl: int | None = None
+    ) -> bool:
+        for key, value in values.items():
+            self._record_size("set", key, value)
+        return await self._timed("multi_set", self.inner.multi_set(values, ttl))
+
+    async def delete(self, key: str) -> bool:
+        return await self._timed("delete", self.inner.delete(key))
+
+    async def multi_delete(self, keys: list[str]) -> bool:
+        return await self._timed("multi_delete", self.inner.multi_delete(keys))
+
+    async def incr(self, key: str) -> int:
+        return await self._timed("incr", self.inner.incr(key))
+
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        return await self._timed("acquire_lock", self.inner.acquire_lock(key, ttl))
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        return await self._timed("release_lock", self.inner.release_lock(key, token))
+
+    def pipeline(self) -> CachePipeline:
+        # keeps the batching of the wrapped cache, operations aren't recorded
+        return self.inner.pipeline()
+
+    # Internals
+    async def _timed[T](self, operation: str, call: Awaitable[T]) -> T:
+        start = perf_counter()
+        try:
+            return await call
+        finally:
+            self.metrics.observe(
+                "cache_operation_seconds",
+                perf_counter() - start,
+                {"operation": operation},
+            )
+
+    def _record_lookup(self, key: str, value: CacheValue | None):
+        labels = {"prefix": self._prefix(key)}
+        if value is None:
+            self.metrics.increment("cache_misses_total", labels=labels)
+            return
+
+        self.metrics.increment("cache_hits_total", labels=labels)
+        self._record_size("get", key, value)
+
+    def _record_size(self, operation: str, key: str, value: CacheValue):
+        self.metrics.observe(
+            "cache_value_bytes",
+            len(value),
+            {"operation": operation, "prefix": self._prefix(key)},
+        )
+
+    def _prefix(self, key: str) -> str:
+        return ":".join(key.split(":", self._depth)[: self._depth])
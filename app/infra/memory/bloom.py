@@ -0,0 +1,37 @@
+from kink import inject
+
+from app.services.ports.bloom import BloomFilter
+
+
+@inject(alias=BloomFilter)
+class InMemoryBloomFilter(BloomFilter):
+    bits: bytearray
+    loaded: bool
+
+    def __init__(self, capacity: int | None = None, error_rate: float | None = None):
+        super().__init__(capacity, error_rate)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.loaded = False
+
+    async def add_many(self, values: list[str]):
+        for value in values:
+            for position in self._positions(value):
+                self.bits[position >> 3] |= 1 << (position & 7)
+
+    async def might_contain_many(self, values: list[str]) -> list[bool]:
+        if not self.loaded:
+            return [True] * len(values)
+
+        return [
+            all(
+                self.bits[position >> 3] & (1 << (position & 7))
+                for position in self._positions(value)
+            )
+            for value in values
+        ]
+
+    async def is_loaded(self) -> bool:
+        return self.loaded
+
+    async def set_loaded(self):
+        self.loaded = True
@@ -1,49 +1,202 @@
-import asyncio
-from typing import Any, Mapping
+import heapq
+import time
+from collections import OrderedDict
+from typing import Mapping, TypedDict
+from uuid import uuid4
 
 from kink import inject
+from pydantic import Field
+from pydantic_settings import BaseSettings
 
-from app.services.ports.cache import Cache
+from app.services.ports.cache import Cache, CacheValue
+
+
+class InMemoryCacheConfig(BaseSettings):
+    MEMORY_CACHE_MAX_ENTRIES: int = Field(
+        description="Max keys held by the in-memory cache", default=100_000
+    )
+    MEMORY_CACHE_MAX_BYTES: int = Field(
+        description="Max bytes of keys and values held by the in-memory cache",
+        default=64 * 1024 * 1024,
+    )
+
+
+class InMemoryCacheStats(TypedDict):
+    size: int
+    bytes: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
 
 
 @inject(alias=Cache)
 class InMemoryCache(Cache):
-    store: dict[str, Any]
+    """LRU bounded by entry count and bytes
+    Expiry is lazy: deadlines sit in a min-heap and are purged on access
+    Held locks are never evicted, they only go once released or expired
+    """
 
-    def __init__(self):
-        self.store = {}
+    store: OrderedDict[str, CacheValue]  # least recently used first
 
-    async def get(self, key: str) -> str | None:
-        result = self.store.get(key, None)
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        super().__init__()
+        config = InMemoryCacheConfig()
+        self.store = OrderedDict()
+        self.max_entries = max_entries or config.MEMORY_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or config.MEMORY_CACHE_MAX_BYTES
+        self._bytes = 0
+        self._deadlines: dict[str, float] = {}
+        self._expiries: list[tuple[float, str]] = []  # heap of (deadline, key)
+        self._locks: set[str] = set()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def stats(self) -> InMemoryCacheStats:
+        lookups = self._hits + self._misses
+        return InMemoryCacheStats(
+            size=len(self.store),
+            bytes=self._bytes,
+            hits=self._hits,
+            misses=self._misses,
+            hit_ratio=self._hits / lookups if lookups else 0.0,
+            evictions=self._evictions,
+            expirations=self._expirations,
+        )
+
+    async def get(self, key: str) -> CacheValue | None:
+        result = self._get(key)
         if result:
-            return str(result)
+            return result
         return None
 
-    async def multi_get(self, keys: list[str]) -> list[str | None]:
-        return [self.store.get(key, None) for key in keys]
-
-    async def set(self, key: str, value: str, ttl: int | None = None) -> bool:
-        self.store[key] = value
-        if ttl:
-            asyncio.create_task(self._delete_with_delay(key, ttl))
+    async def multi_get(self, keys: list[str]) -> list[CacheValue | None]:
+        return [self._get(key) for key in keys]
 
+    async def set(self, key: str, value: CacheValue, ttl: int | None = None) -> bool:
+        self._set(key, value, ttl)
         return True
 
-    async def multi_set(self, values: Mapping[str, str]) -> bool:
+    async def multi_set(
+        self, values: Mapping[str, CacheValue], ttl: int | None = None
+    ) -> bool:
         for key, value in values.items():
-            self.store[key] = value
+            self._set(key, value, ttl)
         return True
 
     async def delete(self, key: str) -> bool:
         return await self.multi_delete([key])
 
     async def multi_delete(self, keys: list[str]) -> bool:
+        self._purge_expired()
+        deleted = True
         for key in keys:
-            result = self.store.pop(key, False)
-            if result is False:
-                return False
-        return True
+            if key not in self.store:
+                deleted = False
+                continue
+            self._remove(key)
+        return deleted
+
+    async def incr(self, key: str) -> int:
+        value = int(self._get(key, count=False) or 0) + 1
+        # like redis, keeps the ttl of the key
+        self._set(key, str(value), keep_ttl=True)
+        return value
+
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        if self._get(key, count=False) is not None:
+            return None
+
+        token = uuid4().hex
+        self._set(key, token, ttl, lock=True)
+        return token
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        if self._get(key, count=False) != token:
+            return False
+        return await self.delete(key)
+
+    # Internals
+    def _get(self, key: str, count: bool = True) -> CacheValue | None:
+        # `count` is off for lookups done on the way to a write, the stats
+        # only reflect reads
+        self._purge_expired()
+        value = self.store.get(key)
+        if value is None:
+            self._misses += count
+            return None
+
+        self._hits += count
+        self.store.move_to_end(key)
+        return value
+
+    def _set(
+        self,
+        key: str,
+        value: CacheValue,
+        ttl: float | None = None,
+        keep_ttl: bool = False,
+        lock: bool = False,
+    ):
+        self._purge_expired()
+        deadline = self._deadlines.get(key) if keep_ttl else None
+        if key in self.store:
+            self._remove(key)
+
+        self.store[key] = value
+        if lock:
+            self._locks.add(key)
+        self._bytes += self._size_of(key, value)
+        if ttl:
+            deadline = time.monotonic() + ttl
+        if deadline is not None:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._expiries, (deadline, key))
+
+        self._evict()
+
+    def _remove(self, key: str):
+        value = self.store.pop(key)
+        self._bytes -= self._size_of(key, value)
+        # its heap entry goes stale and is skipped when popped
+        self._deadlines.pop(key, None)
+        self._locks.discard(key)
+
+    def _evict(self):
+        entries, size = len(self.store), self._bytes
+        victims: list[str] = []
+        for key, value in self.store.items():
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            if key in self._locks:
+                continue
+            victims.append(key)
+            entries -= 1
+            size -= self._size_of(key, value)
+
+        for key in victims:
+            self._remove(key)
+            self._evictions += 1
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        while self._expiries and self._expiries[0][0] <= now:
+            deadline, key = heapq.heappop(self._expiries)
+            if self._deadlines.get(key) == deadline:
+                self._remove(key)
+                self._expirations += 1
+
+        # drop heap entries left by overwritten and deleted keys
+        if len(self._expiries) > 2 * len(self._deadlines) + 1024:
+            self._expiries = [(d, k) for k, d in self._deadlines.items()]
+            heapq.heapify(self._expiries)
 
-    async def _delete_with_delay(self, key: str, ttl: int):
-        await asyncio.sleep(ttl)
-        await self.delete(key)
+    @staticmethod
+    def _size_of(key: str, value: CacheValue) -> int:
+        if isinstance(value, str):
+            value = value.encode()
+        return len(key.encode()) + len(value)
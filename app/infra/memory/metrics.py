@@ -1,12 +1,55 @@
 from kink import inject
 
 from app.services.ports import ObservabilityMetrics
+from app.services.ports.metrics import Labels
+
+type Key = tuple[str, tuple[tuple[str, str], ...]]
 
 
 @inject(alias=ObservabilityMetrics)
 class InMemoryMetrics(ObservabilityMetrics):
+    counters: dict[Key, float]
+    gauges: dict[Key, float]
+    observations: dict[Key, list[float]]
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.observations = {}
+
     def gather_current_metrics(self):
-        pass
+        lines = [f"{self._format(key)} {value}" for key, value in self.counters.items()]
+        lines += [f"{self._format(key)} {value}" for key, value in self.gauges.items()]
+        for key, values in self.observations.items():
+            lines.append(f"{self._format(key, "_count")} {len(values)}")
+            lines.append(f"{self._format(key, "_sum")} {sum(values)}")
+
+        return "\n".join(lines)
 
     def reset_metrics(self):
-        pass
+        self.counters = {}
+        self.gauges = {}
+        self.observations = {}
+
+    def increment(self, name: str, amount: float = 1, labels: Labels | None = None):
+        key = self.key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name: str, value: float, labels: Labels | None = None):
+        self.gauges[self.key(name, labels)] = value
+
+    def observe(self, name: str, value: float, labels: Labels | None = None):
+        self.observations.setdefault(self.key(name, labels), []).append(value)
+
+    @staticmethod
+    def key(name: str, labels: Labels | None = None) -> Key:
+        return name, tuple(sorted((labels or {}).items()))
+
+    # Internals
+    def _format(self, key: Key, suffix: str = "") -> str:
+        name, labels = key
+        if not labels:
+            return f"{name}{suffix}"
+
+        formatted = ",".join(f'{label}="{value}"' for label, value in labels)
+        return f"{name}{suffix}{{{formatted}}}"
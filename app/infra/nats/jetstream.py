@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+from kink import inject
+from nats.aio.client import Client
+from nats.aio.msg import Msg
+from nats.js.api import Header, PubAck
+from nats.js.errors import APIError, NoStreamResponseError
+from nats.nuid import NUID
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+from app.services.ports.publisher import Events, Payload, Publisher
+
+from .connection import NatsConnection
+from .publisher import encode
+
+NO_RESPONDERS_STATUS = "503"
+
+
+class JetStreamPublisherConfig(BaseSettings):
+    NATS_JETSTREAM_MAX_PENDING_ACKS: int = Field(
+        description="Max JetStream publishes waiting on their ack at once",
+        default=4000,
+    )
+    NATS_JETSTREAM_ACK_TIMEOUT: float = Field(
+        description="Seconds a JetStream publish waits for a window slot, and then "
+        "for its ack",
+        default=5,
+    )
+
+
+def _expire(ack: asyncio.Future):
+    if not ack.done():
+        ack.set_exception(TimeoutError("JetStream publish was not acked in time"))
+
+
+@inject()
+class JetStreamEventPublisher(Publisher):
+    """Publishes to JetStream streams, events are only done once stored
+    Publishes don't wait on each other: each carries its own reply subject and
+    acks are matched to it on one inbox subscription, at most
+    NATS_JETSTREAM_MAX_PENDING_ACKS are outstanding across callers
+    """
+
+    nc: Client
+
+    def __init__(self, connection: NatsConnection):
+        config = JetStreamPublisherConfig()
+        self.nc = connection.nc
+        self._ack_timeout = config.NATS_JETSTREAM_ACK_TIMEOUT
+        self._window = asyncio.Semaphore(config.NATS_JETSTREAM_MAX_PENDING_ACKS)
+        self._acks: dict[str, asyncio.Future[PubAck]] = {}
+        self._inbox: str | None = None
+        self._subscribing = asyncio.Lock()
+        self._nuid = NUID()
+
+    async def publish(self, channel: str, payload: Payload):
+        await self.publish_many([Events(channel=channel, payload=payload)])
+
+    async def publish_many(self, events: list[Events]):
+        inbox = await self._ensure_subscribed()
+        loop = asyncio.get_running_loop()
+        acks = []
+        try:
+            for event in events:
+                # each publish gets the timeout for its slot and its ack, so
+                # large batches aren't bounded as a whole
+                async with asyncio.timeout(self._ack_timeout):
+                    await self._window.acquire()
+                token = self._nuid.next().decode()
+                ack = self._acks[token] = loop.create_future()
+                timer = loop.call_later(self._ack_timeout, _expire, ack)
+                ack.add_done_callback(
+                    lambda _, token=token, timer=timer: self._ack_done(token, timer)
+                )
+                acks.append(ack)
+                await self.nc.publish(
+                    event["channel"],
+                    encode(event["payload"]),
+                    reply=f"{inbox}.{token}",
+                )
+
+            results = await asyncio.gather(*acks, return_exceptions=True)
+        except BaseException:
+            # frees their window slots
+            for ack in acks:
+                ack.cancel()
+            raise
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    # Internals
+    async def _ensure_subscribed(self) -> str:
+        async with self._subscribing:
+            if self._inbox is None:
+                inbox = self.nc.new_inbox()
+                await self.nc.subscribe(f"{inbox}.*", cb=self._on_ack)
+                self._inbox = inbox
+        return self._inbox
+
+    async def _on_ack(self, msg: Msg):
+        ack = self._acks.get(msg.subject.rsplit(".", 1)[-1])
+        if ack is None or ack.done():  # timed out already
+            return
+
+        if msg.headers and msg.headers.get(Header.STATUS) == NO_RESPONDERS_STATUS:
+            ack.set_exception(NoStreamResponseError())
+            return
+
+        response = json.loads(msg.data)
+        if "error" in response:
+            ack.set_exception(APIError.from_error(response["error"]))
+            return
+        ack.set_result(PubAck.from_response(response))
+
+    def _ack_done(self, token: str, timer: asyncio.TimerHandle):
+        timer.cancel()
+        self._acks.pop(token, None)
+        self._window.release()
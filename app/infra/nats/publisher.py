@@ -3,11 +3,18 @@ import json
 from kink import inject
 from nats.aio.client import Client
 
-from app.services.ports.publisher import Payload, Publisher
+from app.services.ports.publisher import Events, Payload, Publisher
 
 from .connection import NatsConnection
 
 
+def encode(payload: Payload) -> bytes:
+    # if payload is dict, turn to string
+    if isinstance(payload, dict):
+        payload = json.dumps(payload)
+    return payload.encode()
+
+
 @inject(alias=Publisher)
 class NatsEventPublisher(Publisher):
     nc: Client
@@ -16,8 +23,10 @@ class NatsEventPublisher(Publisher):
         self.nc = connection.nc
 
     async def publish(self, channel: str, payload: Payload):
-        # if payload is dict, turn to string and decode
-        if isinstance(payload, dict):
-            payload = json.dumps(payload)  # turn to string
+        await self.nc.publish(channel, encode(payload))
 
-        await self.nc.publish(channel, payload.encode())
+    async def publish_many(self, events: list[Events]):
+        # publishes only fill the client buffer, one round trip confirms them all
+        for event in events:
+            await self.nc.publish(event["channel"], encode(event["payload"]))
+        await self.nc.flush()
@@ -1,13 +1,53 @@
 from kink import inject
-from prometheus_client import generate_latest
+from prometheus_client import Counter, Gauge, Histogram, generate_latest
 
 from app.services.ports import ObservabilityMetrics
+from app.services.ports.metrics import Labels
+
+type Metric = Counter | Gauge | Histogram
+
+# histograms of sizes, the default buckets are meant for seconds
+BYTES_BUCKETS = tuple(4**i * 64 for i in range(10)) + (float("inf"),)
 
 
 @inject(alias=ObservabilityMetrics)
 class PrometheusMetrics(ObservabilityMetrics):
+    _metrics: dict[str, Metric]
+
+    def __init__(self):
+        self._metrics = {}
+
     def gather_current_metrics(self):
         return generate_latest()
 
     def reset_metrics(self):
         pass
+
+    def increment(self, name: str, amount: float = 1, labels: Labels | None = None):
+        self._get_metric(Counter, name, labels).inc(amount)  # type: ignore
+
+    def set(self, name: str, value: float, labels: Labels | None = None):
+        self._get_metric(Gauge, name, labels).set(value)  # type: ignore
+
+    def observe(self, name: str, value: float, labels: Labels | None = None):
+        self._get_metric(Histogram, name, labels).observe(value)  # type: ignore
+
+    # Internals
+    def _get_metric(
+        self, kind: type[Metric], name: str, labels: Labels | None
+    ) -> Metric:
+        # metrics are registered on first use, label names can't change after
+        metric = self._metrics.get(name)
+        if metric is None:
+            options = {}
+            if kind is Histogram and name.endswith("_bytes"):
+                options["buckets"] = BYTES_BUCKETS
+            metric = kind(
+                name,
+                name.replace("_", " "),
+                labelnames=sorted(labels or {}),
+                **options,
+            )
+            self._metrics[name] = metric
+
+        return metric.labels(**labels) if labels else metric
@@ -0,0 +1,68 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+type MultiGet = Callable[[list[str]], Awaitable[list[Any]]]
+
+
+class GetBatcher:
+    """Coalesces gets issued within `window` seconds into multi gets
+    A window of 0 batches the gets issued in the same event loop tick
+    Identical keys in a batch are fetched once
+    """
+
+    def __init__(self, multi_get: MultiGet, window: float = 0, max_batch: int = 1000):
+        self._multi_get = multi_get
+        self._window = window
+        self._max_batch = max_batch
+        self._pending: dict[str, asyncio.Future] = {}
+        self._scheduled: asyncio.Handle | None = None
+        self._batches: set[asyncio.Task] = set()
+
+    async def get(self, key: str) -> Any:
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self._max_batch:
+                self._flush()
+            elif self._scheduled is None:
+                self._scheduled = (
+                    loop.call_later(self._window, self._flush)
+                    if self._window
+                    else loop.call_soon(self._flush)
+                )
+
+        # shielded so a cancelled caller doesn't cancel the others
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._scheduled = None
+
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        task = asyncio.create_task(self._fetch(pending))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _fetch(self, pending: dict[str, asyncio.Future]):
+        try:
+            values = await self._multi_get(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            # cancelled with the loop on shutdown, callers must not hang
+            for future in pending.values():
+                future.cancel()
+            raise
+
+        for future, value in zip(pending.values(), values):
+            if not future.done():
+                future.set_result(value)
@@ -0,0 +1,63 @@
+from kink import inject
+from pydantic import Field
+from pydantic_settings import BaseSettings
+from redis.asyncio import Redis
+
+from app.services.ports.bloom import BloomFilter
+
+from .connection import RedisConnection
+
+
+class RedisBloomFilterConfig(BaseSettings):
+    REDIS_BLOOM_KEY: str = Field(
+        description="Redis key of the bloom filter bitmap", default="__bloom:user:email"
+    )
+
+
+@inject()
+class RedisBloomFilter(BloomFilter):
+    """Bloom filter in a redis bitmap shared by every pod"""
+
+    rc: Redis
+
+    def __init__(
+        self,
+        connection: RedisConnection,
+        capacity: int | None = None,
+        error_rate: float | None = None,
+    ):
+        super().__init__(capacity, error_rate)
+        self.rc = connection.rc
+        # filters sized differently map values to other bits, they can't share
+        # a bitmap
+        key = RedisBloomFilterConfig().REDIS_BLOOM_KEY
+        self._key = f"{key}:{self.size}:{self.hashes}"
+        self._loaded_key = f"{self._key}:loaded"
+
+    async def add_many(self, values: list[str]):
+        async with self.rc.pipeline(transaction=False) as pipe:
+            for value in values:
+                for position in self._positions(value):
+                    pipe.setbit(self._key, position, 1)
+            await pipe.execute()
+
+    async def might_contain_many(self, values: list[str]) -> list[bool]:
+        async with self.rc.pipeline(transaction=False) as pipe:
+            pipe.exists(self._loaded_key)
+            for value in values:
+                for position in self._positions(value):
+                    pipe.getbit(self._key, position)
+            loaded, *bits = await pipe.execute()
+
+        if not loaded:
+            return [True] * len(values)
+
+        return [
+            all(bits[i : i + self.hashes]) for i in range(0, len(bits), self.hashes)
+        ]
+
+    async def is_loaded(self) -> bool:
+        return bool(await self.rc.exists(self._loaded_key))
+
+    async def set_loaded(self):
+        await self.rc.set(self._loaded_key, 1)
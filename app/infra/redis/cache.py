@@ -1,11 +1,87 @@
-from typing import Mapping
+from typing import Any, Mapping
+from uuid import uuid4
 
 from kink import inject
+from pydantic import Field
+from pydantic_settings import BaseSettings
 from redis.asyncio import Redis
 
-from app.services.ports.cache import Cache
+from app.services.ports.cache import Cache, CachePipeline, CacheValue
 
+from .batcher import GetBatcher
 from .connection import RedisConnection
+from .tracking import ClientTracking
+
+
+# delete the lock only if it wasn't taken over after expiring
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCacheConfig(BaseSettings):
+    REDIS_PIPELINE_CHUNK_SIZE: int = Field(
+        description="Max commands sent to redis in one pipeline round trip",
+        default=1000,
+    )
+    REDIS_BATCH_GETS: bool = Field(
+        description="Coalesce concurrent cache gets into MGETs", default=False
+    )
+    REDIS_BATCH_WINDOW: float = Field(
+        description="Seconds gets wait to be batched, 0 batches gets of the same loop tick",
+        default=0,
+    )
+    REDIS_CLIENT_TRACKING: bool = Field(
+        description="Serve repeated gets locally, kept consistent by RESP3 client tracking",
+        default=False,
+    )
+    REDIS_TRACKING_MAX_KEYS: int = Field(
+        description="Max keys held locally with client tracking", default=10_000
+    )
+    REDIS_TRACKING_PREFIXES: list[str] = Field(
+        description="Key prefixes tracked and held locally, empty for every key",
+        default=[],
+    )
+
+
+class RedisCachePipeline(CachePipeline):
+    """Sends buffered operations in redis pipelines of `chunk_size` commands"""
+
+    rc: Redis
+
+    def __init__(self, cache: "RedisCache", chunk_size: int):
+        super().__init__(cache)
+        self.rc = cache.rc
+        self._chunk_size = chunk_size
+
+    async def execute(self) -> list[Any]:
+        operations, self.operations = self.operations, []
+        results: list[Any] = []
+        for i in range(0, len(operations), self._chunk_size):
+            async with self.rc.pipeline(transaction=False) as pipe:
+                for operation, args in operations[i : i + self._chunk_size]:
+                    match operation:
+                        case "get":
+                            pipe.get(*args)
+                        case "set":
+                            key, value, ttl = args
+                            pipe.set(key, value, ex=ttl)
+                        case "delete":
+                            pipe.delete(*args)
+                        case "incr":
+                            pipe.incr(*args)
+                replies = await pipe.execute()
+
+            for (operation, _), reply in zip(operations[i:], replies):
+                # same shapes as the Cache methods
+                if operation in ("set", "delete"):
+                    reply = bool(reply)
+                results.append(reply)
+
+        return results
 
 
 @inject(alias=Cache)
@@ -13,30 +89,77 @@ class RedisCache(Cache):
     rc: Redis
 
     def __init__(self, connection: RedisConnection):
+        super().__init__()
+        config = RedisCacheConfig()
         self.rc = connection.rc
+        self._chunk_size = config.REDIS_PIPELINE_CHUNK_SIZE
+        self._batcher = None
+        if config.REDIS_BATCH_GETS:
+            self._batcher = GetBatcher(
+                self.rc.mget, config.REDIS_BATCH_WINDOW, self._chunk_size
+            )
+        self._tracking = None
+        if config.REDIS_CLIENT_TRACKING:
+            self._tracking = ClientTracking(
+                self.rc, config.REDIS_TRACKING_MAX_KEYS, config.REDIS_TRACKING_PREFIXES
+            )
 
-    async def get(self, key: str) -> str | None:
-        return await self.rc.get(key)
+    async def get(self, key: str) -> CacheValue | None:
+        if self._tracking is not None:
+            return await self._tracking.get(key, self._get)
+        return await self._get(key)
 
-    async def multi_get(self, keys: list[str]) -> list[str | None]:
+    async def multi_get(self, keys: list[str]) -> list[CacheValue | None]:
+        if self._tracking is not None:
+            return await self._tracking.multi_get(keys, self.rc.mget)
         return await self.rc.mget(keys)
 
-    async def set(self, key: str, value: str, ttl: int | None = None) -> bool:
-        value = str(value)
+    async def set(self, key: str, value: CacheValue, ttl: int | None = None) -> bool:
+        self._invalidate([key])
         ok = await self.rc.set(key, value, ex=ttl)
         return bool(ok)
 
-    async def multi_set(self, values: Mapping[str, str]) -> bool:
-        vals = {}
-        for key, value in values.items():
-            vals[key] = str(value)
+    async def multi_set(
+        self, values: Mapping[str, CacheValue], ttl: int | None = None
+    ) -> bool:
+        self._invalidate(list(values))
+        # MSET can't expire keys, SET EX each key in one pipelined batch
+        async with self.pipeline() as pipe:
+            for key, value in values.items():
+                pipe.set(key, value, ttl)
 
-        ok = await self.rc.mset(vals)
-        return bool(ok)
+        return all(pipe.results)
 
     async def delete(self, key: str) -> bool:
         return await self.multi_delete([key])
 
     async def multi_delete(self, keys: list[str]) -> bool:
+        self._invalidate(keys)
         ok = await self.rc.delete(*keys)
         return bool(ok)
+
+    async def incr(self, key: str) -> int:
+        self._invalidate([key])
+        return await self.rc.incr(key)
+
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        token = uuid4().hex
+        ok = await self.rc.set(key, token, nx=True, px=int(ttl * 1000))
+        return token if ok else None
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        released = await self.rc.eval(RELEASE_LOCK_SCRIPT, 1, key, token)  # type: ignore
+        return bool(released)
+
+    def pipeline(self) -> RedisCachePipeline:
+        return RedisCachePipeline(self, self._chunk_size)
+
+    async def _get(self, key: str) -> CacheValue | None:
+        if self._batcher is not None:
+            return await self._batcher.get(key)
+        return await self.rc.get(key)
+
+    def _invalidate(self, keys: list[str]):
+        # read your own writes before redis pushes the invalidation
+        if self._tracking is not None:
+            self._tracking.invalidate(keys)
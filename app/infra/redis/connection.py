@@ -26,7 +26,8 @@ class RedisConnection(Connection):
             password=config.REDIS_PASSWORD,
             protocol=3,
             db=0,
-            decode_responses=True,
+            # binary safe, cached values are encoded by the cache codec
+            decode_responses=False,
         )
 
         self.rc = rc
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Mapping
+from uuid import uuid4
+
+from kink import inject
+from pydantic import Field
+from pydantic_settings import BaseSettings
+from redis.asyncio import Redis
+
+from app.logger import logger
+from app.services.ports.cache import Cache, CacheValue
+
+from .cache import RedisCache
+from .connection import RedisConnection
+
+
+class TieredCacheConfig(BaseSettings):
+    LOCAL_CACHE_SIZE: int = Field(
+        description="Max keys kept in the in-process cache tier", default=10_000
+    )
+    LOCAL_CACHE_TTL: float = Field(
+        description="Seconds a key is served from the in-process tier", default=5
+    )
+    LOCAL_CACHE_CHANNEL: str = Field(
+        description="Redis pub/sub channel for local cache invalidations",
+        default="__cache:invalidate",
+    )
+
+
+@inject()
+class TieredCache(Cache):
+    """Bounded in-process LRU in front of redis
+    Writes are broadcast over pub/sub so other pods drop their local copies
+    """
+
+    rc: Redis
+    remote: Cache
+    local: OrderedDict[str, tuple[CacheValue, float]]
+
+    def __init__(self, connection: RedisConnection, remote: RedisCache):
+        super().__init__()
+        config = TieredCacheConfig()
+        self.rc = connection.rc
+        self.remote = remote
+        self.local = OrderedDict()
+        self._size = config.LOCAL_CACHE_SIZE
+        self._ttl = config.LOCAL_CACHE_TTL
+        self._channel = config.LOCAL_CACHE_CHANNEL
+        self._node = uuid4().hex
+        # bumped on every invalidation so a slow remote read can't refill a
+        # key that was invalidated meanwhile
+        self._generation = 0
+        self._listener: asyncio.Task | None = None
+
+    async def get(self, key: str) -> CacheValue | None:
+        self._ensure_listening()
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        generation = self._generation
+        value = await self.remote.get(key)
+        if value is not None and generation == self._generation:
+            self._set_local(key, value)
+        return value
+
+    async def multi_get(self, keys: list[str]) -> list[CacheValue | None]:
+        self._ensure_listening()
+        values = [self._get_local(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+
+        generation = self._generation
+        fetched = dict(zip(missing, await self.remote.multi_get(missing)))
+        for key, value in fetched.items():
+            if value is not None and generation == self._generation:
+                self._set_local(key, value)
+
+        return [
+            fetched[key] if value is None else value for key, value in zip(keys, values)
+        ]
+
+    async def set(self, key: str, value: CacheValue, ttl: int | None = None) -> bool:
+        self._ensure_listening()
+        ok = await self.remote.set(key, value, ttl)
+        self._drop_local([key])
+        await self._broadcast([key])
+        return ok
+
+    async def multi_set(
+        self, values: Mapping[str, CacheValue], ttl: int | None = None
+    ) -> bool:
+        self._ensure_listening()
+        ok = await self.remote.multi_set(values, ttl)
+        self._drop_local(list(values))
+        await self._broadcast(list(values))
+        return ok
+
+    async def delete(self, key: str) -> bool:
+        return await self.multi_delete([key])
+
+    async def multi_delete(self, keys: list[str]) -> bool:
+        self._ensure_listening()
+        ok = await self.remote.multi_delete(keys)
+        self._drop_local(keys)
+        await self._broadcast(keys)
+        return ok
+
+    async def incr(self, key: str) -> int:
+        self._ensure_listening()
+        value = await self.remote.incr(key)
+        self._drop_local([key])
+        await self._broadcast([key])
+        return value
+
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        return await self.remote.acquire_lock(key, ttl)
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        return await self.remote.release_lock(key, token)
+
+    def _get_local(self, key: str) -> CacheValue | None:
+        entry = self.local.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.local[key]
+            return None
+
+        self.local.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: CacheValue):
+        self.local[key] = (value, time.monotonic() + self._ttl)
+        self.local.move_to_end(key)
+        while len(self.local) > self._size:
+            self.local.popitem(last=False)
+
+    def _drop_local(self, keys: list[str]):
+        self._generation += 1
+        for key in keys:
+            self.local.pop(key, None)
+
+    async def _broadcast(self, keys: list[str]):
+        message = json.dumps({"node": self._node, "keys": keys})
+        await self.rc.publish(self._channel, message)
+
+    def _ensure_listening(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        pubsub = self.rc.pubsub()
+        try:
+            await pubsub.subscribe(self._channel)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+
+                data = json.loads(message["data"])
+                if data["node"] != self._node:
+                    self._drop_local(data["keys"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # invalidations may have been missed, don't serve what we hold
+            logger.error(f"Local cache invalidation listener failed: {e}")
+            self._drop_local(list(self.local))
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,164 @@
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import TypedDict
+
+from redis.asyncio import Redis
+
+from app.logger import logger
+from app.services.ports.cache import CacheValue
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+
+class TrackingStats(TypedDict):
+    size: int
+    hits: int
+    misses: int
+    invalidations: int
+
+
+class ClientTracking:
+    """Local copies of redis values kept consistent by server assisted tracking
+    A dedicated connection runs `CLIENT TRACKING ON BCAST` redirected to itself
+    and receives the keys redis invalidates, nothing is served locally until
+    it is subscribed or after it dropped
+    """
+
+    rc: Redis
+    local: OrderedDict[str, CacheValue]  # least recently used first
+
+    def __init__(self, rc: Redis, max_keys: int, prefixes: list[str]):
+        self.rc = rc
+        self.local = OrderedDict()
+        self._max_keys = max_keys
+        self._prefixes = prefixes
+        self._tracking = False
+        self._listener: asyncio.Task | None = None
+        # bumped on every invalidation so a read racing one isn't kept
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @property
+    def stats(self) -> TrackingStats:
+        return TrackingStats(
+            size=len(self.local),
+            hits=self._hits,
+            misses=self._misses,
+            invalidations=self._invalidations,
+        )
+
+    async def get(
+        self, key: str, fetch: Callable[[str], Awaitable[CacheValue | None]]
+    ) -> CacheValue | None:
+        self._ensure_listening()
+        if not self._tracking:
+            return await fetch(key)
+
+        value = self.local.get(key)
+        if value is not None:
+            self._hits += 1
+            self.local.move_to_end(key)
+            return value
+
+        self._misses += 1
+        generation = self._generation
+        value = await fetch(key)
+        if value is not None and self._tracking and generation == self._generation:
+            self._store(key, value)
+        return value
+
+    async def multi_get(
+        self,
+        keys: list[str],
+        fetch_many: Callable[[list[str]], Awaitable[list[CacheValue | None]]],
+    ) -> list[CacheValue | None]:
+        self._ensure_listening()
+        if not self._tracking:
+            return await fetch_many(keys)
+
+        values = [self.local.get(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        self._hits += len(keys) - len(missing)
+        self._misses += len(missing)
+        if not missing:
+            return values
+
+        generation = self._generation
+        fetched = dict(zip(missing, await fetch_many(missing)))
+        if self._tracking and generation == self._generation:
+            for key, value in fetched.items():
+                if value is not None:
+                    self._store(key, value)
+
+        return [
+            fetched[key] if value is None else value for key, value in zip(keys, values)
+        ]
+
+    def invalidate(self, keys: list[str] | None = None):
+        """Drop `keys`, every key when None"""
+        self._generation += 1
+        if keys is None:
+            self.local.clear()
+            return
+
+        for key in keys:
+            self.local.pop(key, None)
+
+    def _store(self, key: str, value: CacheValue):
+        self.local[key] = value
+        self.local.move_to_end(key)
+        if len(self.local) > self._max_keys:
+            self.local.popitem(last=False)
+
+    def _ensure_listening(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        try:
+            await self._track()
+        except Exception as e:
+            logger.error(f"Redis client tracking listener failed: {e}")
+            await asyncio.sleep(1)  # back off before the next get restarts it
+
+    async def _track(self):
+        pubsub = self.rc.pubsub()
+        try:
+            # the one the pubsub would take, redis 5.0 requires the command name
+            connection = await self.rc.connection_pool.get_connection("pubsub")
+            pubsub.connection = connection
+            await connection.send_command("CLIENT", "ID")
+            client_id = await connection.read_response()
+            prefixes = [arg for prefix in self._prefixes for arg in ("PREFIX", prefix)]
+            await connection.send_command(
+                "CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefixes
+            )
+            await connection.read_response()
+
+            await pubsub.subscribe(INVALIDATE_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "subscribe":
+                    self._tracking = True
+                    continue
+                if message["type"] != "message":
+                    continue
+
+                # None when the server flushed every key
+                keys = message["data"]
+                self._invalidations += 1
+                self.invalidate(
+                    None if keys is None else [self._decode(key) for key in keys]
+                )
+        finally:
+            # invalidations may have been missed, don't serve what we hold
+            self._tracking = False
+            self.invalidate()
+            # disconnects and releases the connection, so tracking stops with it
+            await pubsub.aclose()
+
+    @staticmethod
+    def _decode(key: str | bytes) -> str:
+        return key.decode() if isinstance(key, bytes) else key
@@ -1,4 +1,8 @@
+import asyncio
+import math
+from itertools import count
 from os import path
+from typing import Any, Literal
 
 from alembic import command
 from alembic.config import Config
@@ -6,11 +10,14 @@ from kink import inject
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from sqlalchemy import Connection as SqlAlchemyConnection
+from sqlalchemy import make_url, text
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 from app.logger import logger
+from app.services.ports import ObservabilityMetrics
 
 from ..connection import Connection
+from .pool import instrumented_pool
 from .tables import add_model_mappings, metadata, remove_model_mappings
 
 
@@ -26,38 +33,123 @@ class SqlConnectionConfig(BaseSettings):
     DB_ECHO: bool = Field(
         description="Boolean for DB to echo operations", default=False
     )
+    # Pool, ignored for SQLite which doesn't use a queue pool
+    DB_POOL_SIZE: int = Field(
+        description="Connections kept open in the pool", default=5
+    )
+    DB_MAX_OVERFLOW: int = Field(
+        description="Connections opened above DB_POOL_SIZE under load", default=10
+    )
+    DB_POOL_TIMEOUT: float = Field(
+        description="Seconds to wait for a pool connection before failing", default=30
+    )
+    DB_POOL_RECYCLE: int = Field(
+        description="Seconds after which connections are replaced, -1 to disable",
+        default=-1,
+    )
+    DB_POOL_PRE_PING: bool = Field(
+        description="Test connections for liveness on checkout", default=False
+    )
+    DB_STATEMENT_CACHE_SIZE: int = Field(
+        description="asyncpg prepared statement cache size, 0 behind pgbouncer",
+        default=100,
+    )
+    # Read replicas, used by queries only
+    DB_REPLICA_URLS: list[str] = Field(
+        description="URLs of read replicas, reads go to the primary when empty",
+        default=[],
+    )
+    DB_REPLICA_SELECTION: Literal["round-robin", "least-busy"] = Field(
+        description="How a replica is picked for each read", default="round-robin"
+    )
+    DB_REPLICA_MAX_LAG: float = Field(
+        description="Seconds of replication lag after which a replica is skipped",
+        default=5,
+    )
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = Field(
+        description="Seconds between replication lag checks", default=5
+    )
+
+
+# replication lag of a caught up replica is 0 even when the primary is idle
+REPLICA_LAG_STMT = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
 
 
 @inject(alias=Connection)
 class SqlConnection(Connection):
     repeatable_read_engine: AsyncEngine
     default_engine: AsyncEngine
+    replica_engines: list[AsyncEngine]
+    metrics: ObservabilityMetrics
+
+    _config: SqlConnectionConfig
+    _replica_lags: list[float]
+    _replica_counter: count
+    _lag_check_task: asyncio.Task | None
+
+    def __init__(self, metrics: ObservabilityMetrics):
+        self.metrics = metrics
+        self.replica_engines = []
+        self._replica_lags = []
+        self._replica_counter = count()
+        self._lag_check_task = None
 
     async def connect(self):
         config = SqlConnectionConfig()
+        self._config = config
 
-        self.default_engine = create_async_engine(
-            config.DB_URL, future=True, echo=config.DB_ECHO
-        )
+        self.default_engine = self._create_engine(config.DB_URL, "primary")
         self.repeatable_read_engine = self.default_engine.execution_options(
             isolation_level="REPEATABLE READ"
         )
+        self.replica_engines = [
+            self._create_engine(url, f"replica-{i}")
+            for i, url in enumerate(config.DB_REPLICA_URLS)
+        ]
 
         await self.apply_migrations()
         add_model_mappings()
 
+        if self.replica_engines:
+            await self._check_replica_lags()
+            self._lag_check_task = asyncio.create_task(self._watch_replica_lags())
+
         logger.info("Database connected 🚨")
 
+    def read_engine(self) -> AsyncEngine:
+        """Engine for reads, a replica within max lag or the primary"""
+        replicas = [
+            engine
+            for engine, lag in zip(self.replica_engines, self._replica_lags)
+            if lag <= self._config.DB_REPLICA_MAX_LAG
+        ]
+        if not replicas:
+            return self.default_engine
+
+        if self._config.DB_REPLICA_SELECTION == "least-busy":
+            return min(replicas, key=self._checked_out)
+
+        return replicas[next(self._replica_counter) % len(replicas)]
+
     async def close(self, cleanup: bool = False):
         if cleanup:
             async with self.default_engine.begin() as conn:
                 remove_model_mappings()
                 for table in metadata.sorted_tables:
                     await conn.execute(table.delete())
-                    await conn.commit()
+
+        if self._lag_check_task:
+            self._lag_check_task.cancel()
 
         await self.default_engine.dispose()
         await self.repeatable_read_engine.dispose()
+        for engine in self.replica_engines:
+            await engine.dispose()
 
     async def apply_migrations(self):
         def run_upgrade(connection: SqlAlchemyConnection, cfg: Config):
@@ -69,3 +161,60 @@ class SqlConnection(Connection):
                 run_upgrade,
                 Config(path.join("app", "infra", "sqlalchemy", "alembic.ini")),
             )
+
+    # Internals
+    def _create_engine(self, url: str, name: str) -> AsyncEngine:
+        return create_async_engine(
+            url,
+            future=True,
+            echo=self._config.DB_ECHO,
+            **self._pool_options(url, name),
+        )
+
+    def _pool_options(self, db_url: str, name: str) -> dict[str, Any]:
+        config = self._config
+        url = make_url(db_url)
+        if url.get_backend_name() == "sqlite":
+            return {}
+
+        options: dict[str, Any] = {
+            "poolclass": instrumented_pool(self.metrics, name),
+            "pool_size": config.DB_POOL_SIZE,
+            "max_overflow": config.DB_MAX_OVERFLOW,
+            "pool_timeout": config.DB_POOL_TIMEOUT,
+            "pool_recycle": config.DB_POOL_RECYCLE,
+            "pool_pre_ping": config.DB_POOL_PRE_PING,
+        }
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {
+                "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+            }
+
+        return options
+
+    def _checked_out(self, engine: AsyncEngine) -> int:
+        checkedout = getattr(engine.pool, "checkedout", None)
+        return checkedout() if checkedout else 0
+
+    async def _check_replica_lags(self):
+        lags = []
+        for engine in self.replica_engines:
+            if engine.dialect.name != "postgresql":
+                lags.append(0.0)
+                continue
+
+            try:
+                async with engine.connect() as conn:
+                    lags.append(float((await conn.execute(REPLICA_LAG_STMT)).scalar()))
+            except Exception as e:
+                # unreachable replicas are skipped until they answer again
+                logger.warning(f"Replica lag check failed: {e}")
+                lags.append(math.inf)
+
+        self._replica_lags = lags
+
+    async def _watch_replica_lags(self):
+        while True:
+            await asyncio.sleep(self._config.DB_REPLICA_LAG_CHECK_INTERVAL)
+            await self._check_replica_lags()
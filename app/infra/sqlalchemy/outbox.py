@@ -0,0 +1,51 @@
+from kink import inject
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.ports import ObservabilityMetrics, OutboxRelay, Publisher
+from app.services.ports.publisher import Events
+
+from .connection import SqlConnection
+from .tables import outbox
+
+
+@inject(alias=OutboxRelay)
+class SqlAlchemyOutboxRelay(OutboxRelay):
+    session_factory: async_sessionmaker[AsyncSession]
+
+    def __init__(
+        self,
+        connection: SqlConnection,
+        publisher: Publisher,
+        metrics: ObservabilityMetrics,
+    ):
+        super().__init__(publisher, metrics)
+
+        self.session_factory = async_sessionmaker(
+            connection.default_engine,
+            expire_on_commit=False,
+        )
+
+    async def relay(self, batch_size: int = 500) -> int:
+        async with self.session_factory() as session:
+            async with session.begin():
+                # rows stay locked until published so concurrent relays skip them
+                stmt = (
+                    select(outbox.c.id, outbox.c.channel, outbox.c.payload)
+                    .order_by(outbox.c.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                rows = (await session.execute(stmt)).all()
+                if not rows:
+                    return 0
+
+                await self._publisher.publish_many(
+                    [Events(channel=row.channel, payload=row.payload) for row in rows]
+                )
+
+                await session.execute(
+                    delete(outbox).where(outbox.c.id.in_([row.id for row in rows]))
+                )
+
+        return len(rows)
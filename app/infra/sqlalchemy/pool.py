@@ -0,0 +1,39 @@
+from time import perf_counter
+
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    PoolProxiedConnection,
+)
+
+from app.services.ports import ObservabilityMetrics
+
+
+def instrumented_pool(
+    metrics: ObservabilityMetrics, name: str
+) -> type[AsyncAdaptedQueuePool]:
+    """Queue pool class exporting checkout wait time and usage to `metrics`
+    A class per engine so pools recreated by SQLAlchemy keep reporting
+    """
+    labels = {"pool": name}
+
+    class InstrumentedPool(AsyncAdaptedQueuePool):
+        def connect(self) -> PoolProxiedConnection:
+            start = perf_counter()
+            try:
+                return super().connect()
+            finally:
+                metrics.observe(
+                    "db_pool_checkout_wait_seconds", perf_counter() - start, labels
+                )
+                self._report_usage()
+
+        def _do_return_conn(self, record: ConnectionPoolEntry):
+            super()._do_return_conn(record)
+            self._report_usage()
+
+        def _report_usage(self):
+            metrics.set("db_pool_checked_out", self.checkedout(), labels)
+            metrics.set("db_pool_overflow", max(self.overflow(), 0), labels)
+
+    return InstrumentedPool
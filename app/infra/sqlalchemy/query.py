@@ -1,24 +1,29 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from collections.abc import AsyncIterator
+
 from kink import inject
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.services.errors import ValidationError
 from app.services.ports import Cache, Query
+from app.services.ports.query import UsersPage
 
 from .connection import SqlConnection
 
 
 @inject(alias=Query)
 class SqlAlchemyQuery(Query):
+    connection: SqlConnection
     session_factory: async_sessionmaker[AsyncSession]
     session: AsyncSession
 
     def __init__(self, connection: SqlConnection, cache: Cache):
         super().__init__(cache)
 
-        self.session_factory = async_sessionmaker(
-            connection.default_engine,
-            expire_on_commit=False,
-        )
+        self.connection = connection
+        self.session_factory = async_sessionmaker(expire_on_commit=False)
 
     async def list_users(
         self,
@@ -26,12 +31,67 @@ class SqlAlchemyQuery(Query):
         skip: int = 0,
         limit: int = 50,
     ) -> list[str]:
-        async with self.session_factory() as session:
+        async with self._session() as session:
             res = await session.execute(
-                text(f"""
+                text("""
                     SELECT "email" FROM "user"
-                    LIMIT {limit}
-                    OFFSET {skip}
-                """)
+                    LIMIT :limit
+                    OFFSET :skip
+                """),
+                {"limit": limit, "skip": skip},
             )
             return [r[0] for r in res]
+
+    async def list_users_after(
+        self,
+        *,
+        after: str | None = None,
+        limit: int = 50,
+    ) -> UsersPage:
+        async with self._session() as session:
+            # fetch one extra row to know if there is a next page
+            res = await session.execute(
+                text("""
+                    SELECT "id", "email" FROM "user"
+                    WHERE "id" > :after
+                    ORDER BY "id"
+                    LIMIT :limit
+                """),
+                {"after": self._decode_cursor(after), "limit": limit + 1},
+            )
+            rows = res.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1][0])
+
+        return {"users": [r[1] for r in rows], "next_cursor": next_cursor}
+
+    async def stream_users(self, *, chunk_size: int = 1000) -> AsyncIterator[list[str]]:
+        async with self._session() as session:
+            # server-side cursor, only `chunk_size` rows are held in memory
+            res = await session.stream(
+                text('SELECT "email" FROM "user" ORDER BY "id"'),
+                execution_options={"yield_per": chunk_size},
+            )
+            async for partition in res.partitions(chunk_size):
+                yield [r[0] for r in partition]
+
+    # Internals
+    def _session(self) -> AsyncSession:
+        # reads are served by replicas when configured
+        return self.session_factory(bind=self.connection.read_engine())
+
+    def _encode_cursor(self, id: int) -> str:
+        return urlsafe_b64encode(str(id).encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor: str | None) -> int:
+        if not cursor:
+            return 0
+
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            return int(urlsafe_b64decode(cursor + padding))
+        except (DecodeError, ValueError):
+            raise ValidationError([{"msg": "Invalid cursor", "field": "after"}])
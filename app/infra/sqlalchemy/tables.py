@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy import JSON, Column, DateTime, Integer, MetaData, String, Table, func
 from sqlalchemy.orm import registry
 
 from app.domain import models
@@ -13,6 +13,16 @@ user = Table(
     Column("email", String, nullable=False, unique=True, index=True),
 )
 
+# domain events waiting to be relayed to the broker (transactional outbox)
+outbox = Table(
+    "outbox",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("channel", String, nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("created_at", DateTime, nullable=False, server_default=func.now()),
+)
+
 # register mapping between table and domain models
 mapper_registry = registry()
 
@@ -1,14 +1,33 @@
 from typing import Literal, cast
 
 from kink import inject
+from sqlalchemy import ColumnElement, Table, delete, insert, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
+from sqlalchemy.orm.util import identity_key
 
+from app.config import EventDispatch
 from app.domain import models
-from app.services.ports import Publisher
+from app.domain.event import Event
+from app.services.errors import ResourceExistsException
+from app.services.ports import BloomFilter, Cache, ObservabilityMetrics, Publisher
 from app.services.ports.uow import Uow, UserRepository
 
 from .connection import SqlConnection
+from .tables import outbox, user
+
+
+UNIQUE_VIOLATION_SQLSTATE = "23505"
+SQLITE_UNIQUE_ERRORS = {"SQLITE_CONSTRAINT_UNIQUE", "SQLITE_CONSTRAINT_PRIMARYKEY"}
+
+
+def _is_unique_violation(e: IntegrityError) -> bool:
+    # asyncpg errors carry the postgres sqlstate, sqlite3 its extended code name
+    if getattr(e.orig, "sqlstate", None) == UNIQUE_VIOLATION_SQLSTATE:
+        return True
+    return getattr(e.orig, "sqlite_errorname", None) in SQLITE_UNIQUE_ERRORS
 
 
 class SqlAlchemyUserRepository(UserRepository):
@@ -21,20 +40,92 @@ class SqlAlchemyUserRepository(UserRepository):
     async def add(self, user: models.User):
         self.session.add(user)
 
+    async def add_many(self, users: list[models.User]) -> list[models.User]:
+        if not users:
+            return []
+
+        # rows bypass the ORM unit of work, so they are written with the
+        # version the Uow bumps seen aggregates to on commit
+        stmt = (
+            self._insert(user)
+            .on_conflict_do_nothing(index_elements=[user.c.email])
+            .returning(user.c.email)
+        )
+        res = await self.session.execute(
+            stmt, [{"email": u.email, "version": u.version + 1} for u in users]
+        )
+        inserted = set(res.scalars().all())
+
+        # users that lost a race on the unique index must not emit events
+        self._seen.difference_update(u for u in users if u.email not in inserted)
+        return [u for u in users if u.email in inserted]
+
     async def find(self, email: str) -> list[models.User]:
         stmt = select(models.User).where(models.User.email == email)  # type: ignore
         res = await self.session.execute(stmt)
         return cast(list[models.User], res.scalars().all())
 
-    async def remove(self, email: str) -> list[models.User]:
-        stmt = select(models.User).where(models.User.email == email)  # type: ignore
+    async def find_many(self, emails: list[str]) -> list[models.User]:
+        if not emails:
+            return []
+
+        stmt = select(models.User).where(models.User.email.in_(emails))  # type: ignore
         res = await self.session.execute(stmt)
-        users = cast(list[models.User], res.scalars().all())
+        return cast(list[models.User], res.scalars().all())
 
-        for user in users:
-            await self.session.delete(user)
+    async def exists(self, email: str) -> bool:
+        stmt = select(literal(1)).where(user.c.email == email).limit(1)
+        res = await self.session.execute(stmt)
+        return res.scalar() is not None
 
-        return users
+    async def exists_many(self, emails: list[str]) -> set[str]:
+        if not emails:
+            return set()
+
+        stmt = select(user.c.email).where(user.c.email.in_(emails))
+        res = await self.session.execute(stmt)
+        return set(res.scalars().all())
+
+    async def remove(self, email: str) -> list[models.User]:
+        return await self._delete(user.c.email == email)
+
+    async def remove_many(self, emails: list[str]) -> list[models.User]:
+        if not emails:
+            return []
+
+        return await self._delete(user.c.email.in_(emails))
+
+    # Internals
+    async def _delete(self, where: ColumnElement[bool]) -> list[models.User]:
+        columns = (user.c.id, user.c.email, user.c.version)
+
+        if self.session.bind.dialect.delete_returning:
+            stmt = delete(user).where(where).returning(*columns)
+            rows = (await self.session.execute(stmt)).all()
+        else:
+            rows = (await self.session.execute(select(*columns).where(where))).all()
+            ids = [row.id for row in rows]
+            await self.session.execute(delete(user).where(user.c.id.in_(ids)))
+
+        return [self._removed_user(row.id, row.email, row.version) for row in rows]
+
+    def _removed_user(self, id: int, email: str, version: int) -> models.User:
+        # rows were deleted outside of the ORM, detach already loaded users so
+        # they are not flushed again and keep their raised domain events
+        key = identity_key(models.User, id)
+        loaded = self.session.identity_map.get(key)
+        if loaded is not None:
+            self.session.expunge(loaded)
+            return cast(models.User, loaded)
+
+        removed = models.User(email=email)
+        removed.version = version
+        return removed
+
+    def _insert(self, table: Table) -> postgresql.Insert | sqlite.Insert:
+        if self.session.bind.dialect.name == "postgresql":
+            return postgresql.insert(table)
+        return sqlite.insert(table)
 
 
 @inject(alias=Uow, use_factory=True)
@@ -48,8 +139,17 @@ class SqlAlchemyUow(Uow):
     _rr_session_factory: async_sessionmaker[AsyncSession]
     _rc_session_factory: async_sessionmaker[AsyncSession]
 
-    def __init__(self, connection: SqlConnection, publisher: Publisher):
-        super().__init__(publisher)
+    def __init__(
+        self,
+        connection: SqlConnection,
+        publisher: Publisher,
+        cache: Cache,
+        metrics: ObservabilityMetrics,
+        emails: BloomFilter,
+        outbox: bool | None = None,
+        dispatch: EventDispatch | None = None,
+    ):
+        super().__init__(publisher, cache, metrics, emails, outbox, dispatch)
         rr_engine = connection.repeatable_read_engine
         def_engine = connection.default_engine
 
@@ -70,7 +170,14 @@ class SqlAlchemyUow(Uow):
                 self.user_repository = SqlAlchemyUserRepository(session)
 
     async def commit(self):
-        await self._session.commit()
+        try:
+            await self._session.commit()
+        except IntegrityError as e:
+            # callers may skip exists checks and rely on unique indexes, other
+            # violations are bugs and surface as is
+            if _is_unique_violation(e):
+                raise ResourceExistsException()
+            raise
 
     async def rollback(self):
         # if nothing to rollback, nothing will happen
@@ -79,6 +186,12 @@ class SqlAlchemyUow(Uow):
     async def close(self):
         await self._session.close()
 
+    async def _add_to_outbox(self, events: list[Event]):
+        await self._session.execute(
+            insert(outbox),
+            [{"channel": event.channel, "payload": event.data} for event in events],
+        )
+
     # Internals
     def _get_session_factory(
         self, isolation_level: Literal["DEFAULT"] | Literal["REPEATABLE READ"]
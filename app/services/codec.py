@@ -0,0 +1,106 @@
+import json
+from collections.abc import Callable
+from functools import cache
+from typing import Any
+
+from app.config import CacheCompression as Compression
+from app.config import CacheSerializer as Serializer
+
+# header byte indexes, append only so stored values keep decoding
+SERIALIZERS: tuple[Serializer, ...] = ("json", "orjson", "msgpack")
+COMPRESSIONS: tuple[Compression, ...] = ("none", "zstd", "lz4")
+
+
+class Codec:
+    """Encodes cached values as a header byte followed by the payload
+    High nibble of the header is the serializer, low nibble the compression,
+    so values written by another codec still decode while config rolls out
+    orjson, msgpack, zstandard and lz4 are only imported when used
+    """
+
+    serializer: Serializer
+    compression: Compression
+    threshold: int
+
+    def __init__(
+        self,
+        serializer: Serializer = "json",
+        compression: Compression = "none",
+        threshold: int = 1024,
+    ):
+        self.serializer = serializer
+        self.compression = compression
+        self.threshold = threshold
+        # fail on startup rather than on the first cache write
+        _serializer(serializer)
+        _compressor(compression)
+
+    def encode(self, value: Any) -> bytes:
+        dumps, _ = _serializer(self.serializer)
+        data = dumps(value)
+
+        compression: Compression = "none"
+        if self.compression != "none" and len(data) >= self.threshold:
+            compress, _ = _compressor(self.compression)
+            data = compress(data)
+            compression = self.compression
+
+        header = SERIALIZERS.index(self.serializer) << 4 | COMPRESSIONS.index(
+            compression
+        )
+        return bytes([header]) + data
+
+    def decode(self, data: bytes) -> Any:
+        if not data:
+            raise ValueError("Empty cached value, no codec header")
+
+        header = data[0]
+        try:
+            serializer = SERIALIZERS[header >> 4]
+            compression = COMPRESSIONS[header & 0x0F]
+        except IndexError:
+            raise ValueError(f"Unknown cache codec header {header:#04x}")
+
+        payload = data[1:]
+        if compression != "none":
+            _, decompress = _compressor(compression)
+            payload = decompress(payload)
+
+        _, loads = _serializer(serializer)
+        return loads(payload)
+
+
+@cache
+def _serializer(
+    name: Serializer,
+) -> tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    match name:
+        case "json":
+            return lambda value: json.dumps(value).encode(), json.loads
+        case "orjson":
+            import orjson
+
+            return orjson.dumps, orjson.loads
+        case "msgpack":
+            import msgpack
+
+            return msgpack.packb, msgpack.unpackb
+
+
+@cache
+def _compressor(
+    name: Compression,
+) -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    match name:
+        case "none":
+            return lambda data: data, lambda data: data
+        case "zstd":
+            import zstandard
+
+            return zstandard.ZstdCompressor().compress, (
+                zstandard.ZstdDecompressor().decompress
+            )
+        case "lz4":
+            import lz4.frame
+
+            return lz4.frame.compress, lz4.frame.decompress
@@ -0,0 +1,87 @@
+import asyncio
+
+from app.config import EventDispatch
+from app.domain.event import Event
+from app.logger import logger
+
+from .ports.publisher import Events, Publisher
+
+
+class EventDispatcher:
+    """Publishes domain events of a committed Uow
+    inline-serial awaits each publish, inline-concurrent hands them to
+    publish_many in batches of batch_size sent one after the other, the
+    publisher pipelines each batch, and background hands them to a task so
+    the caller does not wait on the broker
+    Background publishes are bounded across dispatchers: once max_in_flight
+    events are pending, commits wait for room before handing theirs over
+    """
+
+    # shared across dispatchers so shutdown can wait on every pending publish,
+    # maps each task to the number of events it publishes
+    _background_tasks: dict[asyncio.Task, int] = {}
+
+    _publisher: Publisher
+    _mode: EventDispatch
+    _batch_size: int
+    _max_in_flight: int
+
+    def __init__(
+        self,
+        publisher: Publisher,
+        mode: EventDispatch,
+        batch_size: int = 100,
+        max_in_flight: int = 1000,
+    ):
+        self._publisher = publisher
+        self._mode = mode
+        self._batch_size = batch_size
+        self._max_in_flight = max_in_flight
+
+    async def dispatch(self, events: list[Event]):
+        if not events:
+            return
+
+        match self._mode:
+            case "inline-serial":
+                for event in events:
+                    await self._publisher.publish(event.channel, event.data)
+            case "inline-concurrent":
+                await self._publish_batched(events)
+            case "background":
+                await self._wait_for_room(len(events))
+                task = asyncio.create_task(self._publish_in_background(events))
+                self._background_tasks[task] = len(events)
+                task.add_done_callback(self._background_tasks.pop)
+
+    @classmethod
+    async def flush(cls):
+        """Wait for background publishes, called on shutdown"""
+        await asyncio.gather(*cls._background_tasks, return_exceptions=True)
+
+    # Internals
+    async def _wait_for_room(self, count: int):
+        # a commit larger than the bound waits for every other one to finish
+        count = min(count, self._max_in_flight)
+        while (
+            self._background_tasks
+            and sum(self._background_tasks.values()) + count > self._max_in_flight
+        ):
+            await asyncio.wait(
+                list(self._background_tasks), return_when=asyncio.FIRST_COMPLETED
+            )
+
+    async def _publish_batched(self, events: list[Event]):
+        for i in range(0, len(events), self._batch_size):
+            await self._publisher.publish_many(
+                [
+                    Events(channel=event.channel, payload=event.data)
+                    for event in events[i : i + self._batch_size]
+                ]
+            )
+
+    async def _publish_in_background(self, events: list[Event]):
+        try:
+            await self._publish_batched(events)
+        except Exception as e:
+            logger.error(f"Failed to publish {len(events)} domain events: {e}")
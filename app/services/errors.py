@@ -32,6 +32,11 @@ class ResourceExistsException(ServiceException):
         super().__init__(msg)
 
 
+class ServiceUnavailableException(ServiceException):
+    def __init__(self, msg: str = "Service unavailable"):
+        super().__init__(msg)
+
+
 class ValidationError(ServiceException):
     def __init__(self, detail: list[Detail], msg: str = "Invalid parameters passed"):
         super().__init__(msg, detail)
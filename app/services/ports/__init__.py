@@ -1,8 +1,20 @@
 from .auth import Auth
+from .bloom import BloomFilter
 from .cache import Cache
 from .metrics import ObservabilityMetrics
+from .outbox import OutboxRelay
 from .publisher import Publisher
-from .query import Query
+from .query import Query, cached
 from .uow import Uow
 
-__all__ = ["Uow", "Cache", "Publisher", "Query", "ObservabilityMetrics", "Auth"]
+__all__ = [
+    "Uow",
+    "Cache",
+    "Publisher",
+    "Query",
+    "ObservabilityMetrics",
+    "Auth",
+    "BloomFilter",
+    "OutboxRelay",
+    "cached",
+]
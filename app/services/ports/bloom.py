@@ -0,0 +1,53 @@
+import hashlib
+import math
+from abc import ABC, abstractmethod
+
+from app.config import config
+
+
+class BloomFilter(ABC):
+    """Port to a probabilistic set of strings, used for existing user emails
+    `might_contain*` have no false negatives once loaded, until then it answers True
+    Values can't be removed, stale positives only cost the lookup they'd skip
+    """
+
+    size: int  # bits
+    hashes: int
+
+    def __init__(self, capacity: int | None = None, error_rate: float | None = None):
+        capacity = capacity or config.BLOOM_CAPACITY
+        error_rate = error_rate or config.BLOOM_ERROR_RATE
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+
+    @abstractmethod
+    async def add_many(self, values: list[str]):
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def might_contain_many(self, values: list[str]) -> list[bool]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def is_loaded(self) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def set_loaded(self):
+        """Mark every existing value as added, negatives are trusted from now on"""
+        raise NotImplementedError()
+
+    async def add(self, value: str):
+        await self.add_many([value])
+
+    async def might_contain(self, value: str) -> bool:
+        [contained] = await self.might_contain_many([value])
+        return contained
+
+    # Internals
+    def _positions(self, value: str) -> list[int]:
+        # double hashing, k positions out of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8])
+        h2 = int.from_bytes(digest[8:]) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
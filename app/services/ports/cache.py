@@ -1,22 +1,88 @@
 from abc import ABC, abstractmethod
-from typing import Mapping
+from typing import Any, Literal, Mapping, Self
+
+from app.config import config
+from app.logger import logger
+
+from ..codec import Codec
+
+# redis replies with bytes, values set as str are stored as utf-8
+type CacheValue = str | bytes
+type CacheOperation = Literal["get", "set", "delete", "incr"]
+
+
+class CachePipeline:
+    """Buffers cache operations, they run when the `pipeline()` block exits
+    Results are in `results`, in the order the operations were added
+    Base impl runs them one by one, adapters batch them in fewer round trips
+    """
+
+    operations: list[tuple[CacheOperation, tuple]]
+    results: list[Any]
+
+    def __init__(self, cache: "Cache"):
+        self._cache = cache
+        self.operations = []
+        self.results = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.results = await self.execute()
+
+    def get(self, key: str) -> Self:
+        self.operations.append(("get", (key,)))
+        return self
+
+    def set(self, key: str, value: CacheValue, ttl: int | None = None) -> Self:
+        self.operations.append(("set", (key, value, ttl)))
+        return self
+
+    def delete(self, key: str) -> Self:
+        self.operations.append(("delete", (key,)))
+        return self
+
+    def incr(self, key: str) -> Self:
+        self.operations.append(("incr", (key,)))
+        return self
+
+    async def execute(self) -> list[Any]:
+        operations, self.operations = self.operations, []
+        return [
+            await getattr(self._cache, operation)(*args)
+            for operation, args in operations
+        ]
 
 
 class Cache(ABC):
+    # encodes values set through `set_value`, see `Codec`
+    codec: Codec
+
+    def __init__(self):
+        self.codec = Codec(
+            config.CACHE_SERIALIZER,
+            config.CACHE_COMPRESSION,
+            config.CACHE_COMPRESSION_THRESHOLD,
+        )
+
     @abstractmethod
-    async def get(self, key: str) -> str | None:
+    async def get(self, key: str) -> CacheValue | None:
         raise NotImplementedError()
 
     @abstractmethod
-    async def multi_get(self, keys: list[str]) -> list[str | None]:
+    async def multi_get(self, keys: list[str]) -> list[CacheValue | None]:
         raise NotImplementedError()
 
     @abstractmethod
-    async def set(self, key: str, value: str, ttl: int | None = None) -> bool:
+    async def set(self, key: str, value: CacheValue, ttl: int | None = None) -> bool:
         raise NotImplementedError()
 
     @abstractmethod
-    async def multi_set(self, values: Mapping[str, str]) -> bool:
+    async def multi_set(
+        self, values: Mapping[str, CacheValue], ttl: int | None = None
+    ) -> bool:
         raise NotImplementedError()
 
     @abstractmethod
@@ -26,3 +92,55 @@ class Cache(ABC):
     @abstractmethod
     async def multi_delete(self, keys: list[str]) -> bool:
         raise NotImplementedError()
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increment the integer at `key`, missing keys start at 0"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        """Set `key` only if absent for `ttl` seconds
+        Returns a token to release the lock, None if it is held elsewhere
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def release_lock(self, key: str, token: str) -> bool:
+        """Delete `key` if it still holds `token`"""
+        raise NotImplementedError()
+
+    def pipeline(self) -> CachePipeline:
+        """Batch operations, `async with cache.pipeline() as pipe: pipe.set(...)`"""
+        return CachePipeline(self)
+
+    async def get_value(self, key: str) -> Any | None:
+        """`get` decoded with the codec, values that don't decode are misses"""
+        data = await self.get(key)
+        if data is None:
+            return None
+        if isinstance(data, str):
+            data = data.encode()
+
+        try:
+            return self.codec.decode(data)
+        except Exception as e:
+            # dropped so the next read recomputes it instead of failing again
+            logger.error(f"Failed to decode cached value {key}: {e}")
+            await self.delete(key)
+            return None
+
+    async def set_value(self, key: str, value: Any, ttl: int | None = None) -> bool:
+        """`set` encoded with the codec"""
+        return await self.set(key, self.codec.encode(value), ttl)
+
+    async def tag_versions(self, tags: list[str]) -> list[int]:
+        """Current version of each tag, cached values embed these in their keys"""
+        versions = await self.multi_get([f"__tag:{tag}" for tag in tags])
+        return [int(version or 0) for version in versions]
+
+    async def invalidate_tags(self, tags: list[str]):
+        # bumping the version orphans every key built with the previous one,
+        # those expire on their own ttl
+        for tag in tags:
+            await self.incr(f"__tag:{tag}")
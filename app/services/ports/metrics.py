@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import Mapping
+
+type Labels = Mapping[str, str]
 
 
 class ObservabilityMetrics(ABC):
@@ -9,3 +12,18 @@ class ObservabilityMetrics(ABC):
     @abstractmethod
     def reset_metrics(self):
         raise NotImplementedError()
+
+    @abstractmethod
+    def increment(self, name: str, amount: float = 1, labels: Labels | None = None):
+        """Add `amount` to a counter"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set(self, name: str, value: float, labels: Labels | None = None):
+        """Set the current value of a gauge"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def observe(self, name: str, value: float, labels: Labels | None = None):
+        """Record a value in a histogram (latencies, sizes)"""
+        raise NotImplementedError()
@@ -0,0 +1,45 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+from app.logger import logger
+
+from .metrics import ObservabilityMetrics
+from .publisher import Publisher
+
+MAX_BACKOFF = 30.0
+
+
+class OutboxRelay(ABC):
+    """Port to relay domain events stored by an outbox Uow to the Publisher
+    Delivery is at-least-once: events are only removed once published
+    """
+
+    _publisher: Publisher
+    _metrics: ObservabilityMetrics
+
+    def __init__(self, publisher: Publisher, metrics: ObservabilityMetrics):
+        self._publisher = publisher
+        self._metrics = metrics
+
+    @abstractmethod
+    async def relay(self, batch_size: int = 500) -> int:
+        """Publish up to `batch_size` stored events, returns the number relayed"""
+        raise NotImplementedError()
+
+    async def run(self, batch_size: int = 500, interval: float = 1.0):
+        backoff = interval
+        while True:
+            try:
+                relayed = await self.relay(batch_size)
+            except Exception as e:
+                # failed batches stay in the outbox, retried once the broker
+                # or database is back
+                logger.error(f"Failed to relay outbox events: {e}")
+                self._metrics.increment("outbox_relay_errors_total")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+
+            backoff = interval
+            if relayed < batch_size:  # drained, wait for new events
+                await asyncio.sleep(interval)
@@ -13,3 +13,8 @@ class Publisher(ABC):
     @abstractmethod
     async def publish(self, channel: str, payload: Payload):
         raise NotImplementedError()
+
+    async def publish_many(self, events: list[Events]):
+        """Publish events in order, adapters override it to pipeline them"""
+        for event in events:
+            await self.publish(event["channel"], event["payload"])
@@ -1,32 +1,108 @@
+import asyncio
+import hashlib
 import json
+import math
+import random
+import time
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Awaitable, Callable
 from functools import wraps
-from inspect import signature
-from typing import Literal
+from inspect import Signature, signature
+from typing import Any, Literal, TypedDict
 
 from app.config import config
+from app.logger import logger
 
 from .cache import Cache
 
 
+class UsersPage(TypedDict):
+    users: list[str]
+    next_cursor: str | None
+
+
+class CacheOptions(TypedDict):
+    ttl: int | None
+    tags: list[str]
+    key: Callable[..., str] | None
+
+
+class CacheStats(TypedDict):
+    hits: int
+    misses: int
+
+
+def cached(
+    ttl: int | None = None,
+    tags: list[str] | None = None,
+    key: Callable[..., str] | None = None,
+):
+    """Mark a `Query` method to be cached
+    `ttl` defaults to the query ttl, `tags` are invalidated by Uow commits and
+    `key` builds the key from the bound arguments instead of the default builder
+    Overrides of a marked method are cached with the same options
+    """
+
+    def decorator[F: Callable](fn: F) -> F:
+        fn.__cached__ = CacheOptions(ttl=ttl, tags=tags or [], key=key)  # type: ignore
+        return fn
+
+    return decorator
+
+
+def _normalize(value: Any) -> str:
+    normalized = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    # keep keys short, long values are hashed
+    if len(normalized) > 64:
+        return "#" + hashlib.sha256(normalized.encode()).hexdigest()[:32]
+    return normalized
+
+
 class Query(ABC):
     """Port to query views / list of objects from database
     Impl is a transactionless select stmt
     Port also implements a cache-aside strategy
+    Methods marked `@cached` declare tags, a Uow commit touching an aggregate
+    of that type invalidates them
+    Concurrent misses on a key are coalesced so only one caller recomputes,
+    across pods too when CACHE_LOCK is enabled
+    Past `_ttl` an entry is served stale for `_stale_ttl` while it refreshes in
+    the background, and it may refresh early before that (XFetch)
     """
 
     _cache: Cache
     _cache_key_prefix: Literal["__port:Query"]
     _ttl: int | None
+    _stale_ttl: int
+    _lock: bool
+    _in_flight: dict[str, asyncio.Task]
+    _refreshing: dict[str, asyncio.Task]
+    _cached_methods: dict[str, CacheOptions]
+    cache_stats: dict[str, CacheStats]
 
-    _cache_list = ["list_users"]  # List of methods to be cached
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # resolve options once per class, subclasses override their bases
+        cls._cached_methods = {}
+        for klass in reversed(cls.__mro__):
+            for name, attr in vars(klass).items():
+                options = getattr(attr, "__cached__", None)
+                if options is not None:
+                    cls._cached_methods[name] = options
 
     def __init__(self, cache: Cache, ttl: int | None = None):
         self._cache = cache
         self._cache_key_prefix = "__port:Query"
-        self._ttl = ttl or config.CACHE_TTL
+        self._ttl = config.CACHE_TTL if ttl is None else ttl
+        self._stale_ttl = config.CACHE_STALE_TTL
+        self._lock = config.CACHE_LOCK
+        self._in_flight = {}
+        # apart from _in_flight, misses must not await a refresh's None
+        self._refreshing = {}
+        self.cache_stats = {}
         self._decorate_to_be_cached_methods()
 
+    @cached(tags=["user"])
     @abstractmethod
     async def list_users(
         self,
@@ -36,31 +112,185 @@ class Query(ABC):
     ) -> list[str]:
         raise NotImplementedError()
 
+    @cached(tags=["user"])
+    @abstractmethod
+    async def list_users_after(
+        self,
+        *,
+        after: str | None = None,
+        limit: int = 50,
+    ) -> UsersPage:
+        """Keyset pagination, `after` is the opaque `next_cursor` of the previous page"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def stream_users(self, *, chunk_size: int = 1000) -> AsyncIterator[list[str]]:
+        """Stream every user in chunks of `chunk_size`
+        Not `@cached`, results are read straight from the database
+        """
+        raise NotImplementedError()
+
     # Internals
     def _decorate_to_be_cached_methods(self):
-        for name in self._cache_list:
-            method = getattr(self, name)
-
-            sig = signature(method)
-            parameters = sig.parameters
-            keys = list(parameters.keys())
-
-            @wraps(method)
-            async def fn(*args, **kwargs):
-                if len(args) > 1:
-                    raise ValueError(
-                        "use kwargs for query methods so we can cache on parameter values"
-                    )
-                cache_key_prefix = f"{self._cache_key_prefix}:{name}"
-                param_values = [f"{key}:{kwargs.get(key, "<default>")}" for key in keys]
-                cache_key = f"{cache_key_prefix}:{":".join(param_values)}"
-
-                result = await self._cache.get(cache_key)
-                if result:
-                    return json.loads(result)
-
-                result = await method(*args, **kwargs)
-                await self._cache.set(cache_key, json.dumps(result), self._ttl)
-                return result
-
-            setattr(self, name, fn)
+        for name, options in self._cached_methods.items():
+            self._decorate_to_be_cached_method(name, options)
+
+    def _decorate_to_be_cached_method(self, name: str, options: CacheOptions):
+        method = getattr(self, name)
+        sig = signature(method)
+        ttl = options["ttl"]  # None falls back to the query ttl
+        stats = self.cache_stats[name] = CacheStats(hits=0, misses=0)
+
+        @wraps(method)
+        async def fn(*args, **kwargs):
+            cache_key = await self._cache_key(name, sig, options, args, kwargs)
+
+            def compute():
+                return method(*args, **kwargs)
+
+            entry = await self._cache.get_value(cache_key)
+            if entry is None:
+                stats["misses"] += 1
+                return await self._single_flight(cache_key, compute, ttl)
+
+            stats["hits"] += 1
+            if self._should_refresh(entry):
+                self._revalidate(cache_key, compute, ttl)
+            return entry["v"]
+
+        setattr(self, name, fn)
+
+    async def _cache_key(
+        self,
+        name: str,
+        sig: Signature,
+        options: CacheOptions,
+        args: tuple,
+        kwargs: dict[str, Any],
+    ) -> str:
+        # bound with defaults so `f()` and `f(limit=50)` share a key
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        if options["key"] is not None:
+            params = options["key"](**bound.arguments)
+        else:
+            params = ",".join(
+                f"{param}={_normalize(value)}"
+                for param, value in sorted(bound.arguments.items())
+            )
+
+        tags = options["tags"]
+        versions = await self._cache.tag_versions(tags)
+        tag_values = ",".join(
+            f"{tag}={version}" for tag, version in zip(tags, versions)
+        )
+        return f"{self._cache_key_prefix}:{name}:{params}:tags:{tag_values}"
+
+    def _should_refresh(self, entry: dict[str, Any]) -> bool:
+        # entry is {"v": value, "d": seconds to compute, "e": soft expiry}
+        if entry["e"] is None:
+            return False
+
+        now = time.time()
+        if now >= entry["e"]:
+            return True
+
+        # XFetch, the closer to expiry and the slower the value is to compute
+        # the likelier a request refreshes it ahead of time
+        beta = config.CACHE_EARLY_REFRESH_BETA
+        return now - entry["d"] * beta * math.log(1 - random.random()) >= entry["e"]
+
+    def _revalidate(
+        self, cache_key: str, compute: Callable[[], Awaitable[Any]], ttl: int | None
+    ):
+        # refresh in the background, callers keep the value they already have
+        if cache_key in self._refreshing:
+            return
+
+        task = asyncio.create_task(self._refresh(cache_key, compute, ttl))
+        self._refreshing[cache_key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(cache_key, None))
+
+    async def _refresh(
+        self, cache_key: str, compute: Callable[[], Awaitable[Any]], ttl: int | None
+    ):
+        try:
+            if not self._lock:
+                await self._compute_and_set(cache_key, compute, ttl)
+                return
+
+            lock_key = f"{cache_key}:lock"
+            token = await self._cache.acquire_lock(lock_key, config.CACHE_LOCK_TIMEOUT)
+            if token is None:
+                return  # another pod is refreshing it
+
+            try:
+                await self._compute_and_set(cache_key, compute, ttl)
+            finally:
+                await self._cache.release_lock(lock_key, token)
+        except Exception as e:
+            logger.error(f"Failed to refresh cached query {cache_key}: {e}")
+
+    async def _single_flight(
+        self, cache_key: str, compute: Callable[[], Awaitable[Any]], ttl: int | None
+    ) -> Any:
+        # callers missing the same key await the task of the first one
+        task = self._in_flight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._recompute(cache_key, compute, ttl))
+            self._in_flight[cache_key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(cache_key, None))
+
+        # shielded so a cancelled caller doesn't cancel the others
+        return await asyncio.shield(task)
+
+    async def _recompute(
+        self, cache_key: str, compute: Callable[[], Awaitable[Any]], ttl: int | None
+    ) -> Any:
+        if not self._lock:
+            return await self._compute_and_set(cache_key, compute, ttl)
+
+        lock_key = f"{cache_key}:lock"
+        token = await self._cache.acquire_lock(lock_key, config.CACHE_LOCK_TIMEOUT)
+        if token is None:
+            # another pod recomputes, use its result unless it gave up
+            entry = await self._wait_for(cache_key, config.CACHE_LOCK_TIMEOUT)
+            if entry is not None:
+                return entry["v"]
+            return await self._compute_and_set(cache_key, compute, ttl)
+
+        try:
+            return await self._compute_and_set(cache_key, compute, ttl)
+        finally:
+            await self._cache.release_lock(lock_key, token)
+
+    async def _compute_and_set(
+        self, cache_key: str, compute: Callable[[], Awaitable[Any]], ttl: int | None
+    ) -> Any:
+        start = time.perf_counter()
+        result = await compute()
+        delta = time.perf_counter() - start
+
+        if ttl is None:
+            ttl = self._ttl
+        if ttl is None:
+            entry = {"v": result, "d": delta, "e": None}
+            await self._cache.set_value(cache_key, entry)
+        else:
+            entry = {"v": result, "d": delta, "e": time.time() + ttl}
+            await self._cache.set_value(cache_key, entry, ttl + self._stale_ttl)
+
+        return result
+
+    async def _wait_for(self, cache_key: str, timeout: float) -> dict[str, Any] | None:
+        delay = 0.01
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(delay)
+            entry = await self._cache.get_value(cache_key)
+            if entry is not None:
+                return entry
+            delay = min(delay * 2, 0.5)
+
+        return None
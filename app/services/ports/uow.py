@@ -2,22 +2,41 @@ from abc import ABC, abstractmethod
 from collections.abc import Awaitable, Callable
 from functools import wraps
 from inspect import signature
-from typing import Any, Literal
+from typing import Any, Literal, get_args, get_origin
 
+from app.config import EventDispatch, config
 from app.domain.aggregate import Aggregate
 from app.domain.event import Event
 from app.domain.models import User
+from app.logger import logger
 
+from ..dispatcher import EventDispatcher
+from ..errors import ServiceUnavailableException
 from ..reflection import Reflector
+from .bloom import BloomFilter
+from .cache import Cache
+from .metrics import ObservabilityMetrics
 from .publisher import Publisher
 
 
+def _is_aggregate_annotation(annotation: Any) -> bool:
+    # matches `User` as well as `list[User]`
+    if get_origin(annotation) is list:
+        annotation = get_args(annotation)[0]
+
+    return isinstance(annotation, type) and issubclass(annotation, Aggregate)
+
+
 class Repository[T: Aggregate](ABC):
     _seen: set[T]
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # decorate once per class instead of on every instantiation
+        cls._decorate_methods()
+
     def __init__(self):
         self._seen = set()
-        self._decorate_methods()
 
     @property
     def seen(self) -> set[T]:
@@ -28,37 +47,49 @@ class Repository[T: Aggregate](ABC):
         raise ValueError("Seen cannot be set")
 
     # Internals
-    def _decorate_methods(self):
-        self._decorate_method("find")
-        self._decorate_method("remove")
-        self._decorate_method("add")
+    @classmethod
+    def _decorate_methods(cls):
+        cls._decorate_method("find")
+        cls._decorate_method("remove")
+        cls._decorate_method("add")
 
+    @classmethod
     def _get_methods(
-        self, startswith: Literal["find"] | Literal["remove"] | Literal["add"]
+        cls, startswith: Literal["find"] | Literal["remove"] | Literal["add"]
     ) -> list[str]:
-        return Reflector._get_methods(self, startswith)
+        return Reflector._get_methods(cls, startswith)
 
+    @classmethod
     def _decorate_method(
-        self, startswith: Literal["find"] | Literal["remove"] | Literal["add"]
+        cls, startswith: Literal["find"] | Literal["remove"] | Literal["add"]
     ):
-        methods = self._get_methods(startswith)
+        methods = cls._get_methods(startswith)
 
         if startswith == "add":
-            decoration = self._add_decorator
+            decoration = cls._add_decorator
         else:
-            decoration = self._add_to_seen_decorator
+            decoration = cls._add_to_seen_decorator
 
-        for method in methods:
-            decorated_method = decoration(getattr(self, method))
-            setattr(self, method, decorated_method)
+        for name in methods:
+            method = getattr(cls, name)
+            # inherited methods were decorated with their class
+            if getattr(method, "__seen_decorated__", False):
+                continue
+            if getattr(method, "__isabstractmethod__", False):
+                continue
 
+            decorated_method = decoration(method)
+            decorated_method.__seen_decorated__ = True  # type: ignore
+            setattr(cls, name, decorated_method)
+
+    @staticmethod
     def _add_to_seen_decorator(
-        self, method: Callable[[Any, Any], Awaitable[list[T]]]
-    ) -> Callable[[Any, Any], Awaitable[list[T]]]:
+        method: Callable[..., Awaitable[list[T]]],
+    ) -> Callable[..., Awaitable[list[T]]]:
         # takes find_* method and adds returned objects to seen set
         @wraps(method)
-        async def fn(*args, **kwargs):
-            model = await method(*args, **kwargs)
+        async def fn(self: Repository[T], *args, **kwargs):
+            model = await method(self, *args, **kwargs)
             if isinstance(model, list):
                 for m in model:
                     self._seen.add(m)
@@ -69,34 +100,34 @@ class Repository[T: Aggregate](ABC):
 
         return fn
 
+    @staticmethod
     def _add_decorator(
-        self, method: Callable[[Any, Any], Awaitable[list[T]]]
-    ) -> Callable[[Any, Any], Awaitable[list[T]]]:
+        method: Callable[..., Awaitable[list[T]]],
+    ) -> Callable[..., Awaitable[list[T]]]:
+        # inspect passed method once and find param positions mapping to T
+        parameters = list(signature(method).parameters.values())[1:]  # skip self
+        aggregate_parameters = [
+            (i, parameter.name)
+            for i, parameter in enumerate(parameters)
+            if _is_aggregate_annotation(parameter.annotation)
+        ]
+
         @wraps(method)
-        async def fn(*args, **kwargs):
-            # inspect passed method and find param name mapping to T
-            sig = signature(method)
-            parameters = sig.parameters
-            keys = list(parameters.keys())
-
-            for i in range(len(keys)):
-                key = keys[i]
-                param_metadata = parameters[key]
-                annotation = param_metadata.annotation
-
-                if issubclass(annotation, Aggregate):
-                    # Found parameter with annotation to model
-                    if key in kwargs:
-                        model = kwargs[key]
-                    else:
-                        model = args[i]
-
-                    if isinstance(model, list):
-                        self.seen.update(model)
-                    else:
-                        self.seen.add(model)
-
-            return await method(*args, **kwargs)
+        async def fn(self: Repository[T], *args, **kwargs):
+            for i, key in aggregate_parameters:
+                if key in kwargs:
+                    model = kwargs[key]
+                elif i < len(args):
+                    model = args[i]
+                else:
+                    continue
+
+                if isinstance(model, list):
+                    self._seen.update(model)
+                else:
+                    self._seen.add(model)
+
+            return await method(self, *args, **kwargs)
 
         return fn
 
@@ -118,14 +149,36 @@ class UserRepository(Repository[User], ABC):
     async def add(self, user: User):
         raise NotImplementedError()
 
+    @abstractmethod
+    async def add_many(self, users: list[User]) -> list[User]:
+        """Insert users skipping emails that already exist, returns inserted users"""
+        raise NotImplementedError()
+
     @abstractmethod
     async def find(self, email: str) -> list[User]:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def find_many(self, emails: list[str]) -> list[User]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def exists(self, email: str) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def exists_many(self, emails: list[str]) -> set[str]:
+        """Returns the subset of emails that already exist"""
+        raise NotImplementedError()
+
     @abstractmethod
     async def remove(self, email: str) -> list[User]:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def remove_many(self, emails: list[str]) -> list[User]:
+        raise NotImplementedError()
+
 
 class Uow(ABC):
     # repositories
@@ -133,13 +186,40 @@ class Uow(ABC):
 
     # Internals
     _publisher: Publisher
+    _cache: Cache
+    _metrics: ObservabilityMetrics
+    _emails: BloomFilter
+    _dispatcher: EventDispatcher
+    _outbox: bool
     _isolation_level: Literal["REPEATABLE READ"] | Literal["READ COMMITTED"]
 
-    def __init__(self, publisher: Publisher):
+    def __init__(
+        self,
+        publisher: Publisher,
+        cache: Cache,
+        metrics: ObservabilityMetrics,
+        emails: BloomFilter,
+        outbox: bool | None = None,
+        dispatch: EventDispatch | None = None,
+    ):
         self._publisher = publisher
-        self._decorate_defined_commit_method()
+        self._cache = cache
+        self._metrics = metrics
+        self._emails = emails
+        self._dispatcher = EventDispatcher(
+            publisher,
+            dispatch or config.UOW_EVENT_DISPATCH,
+            config.UOW_EVENT_BATCH_SIZE,
+            config.UOW_MAX_IN_FLIGHT_EVENTS,
+        )
+        self._outbox = config.UOW_OUTBOX if outbox is None else outbox
         self._isolation_level = "READ COMMITTED"
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # decorate once per class instead of on every instantiation
+        cls._decorate_defined_commit_method()
+
     @property
     def repositories(self) -> list[Repository]:
         return [self.user_repository]
@@ -160,6 +240,11 @@ class Uow(ABC):
     async def close(self):
         raise NotImplementedError()
 
+    @abstractmethod
+    async def _add_to_outbox(self, events: list[Event]):
+        """Store events in the current transaction so they are relayed after commit"""
+        raise NotImplementedError()
+
     async def __aexit__(self, exc_type, exc, tb):
         await self.rollback()
         await self.close()
@@ -192,20 +277,72 @@ class Uow(ABC):
 
         return events
 
-    def _decorate_defined_commit_method(self):
+    async def _dispatch(self, events: list[Event]):
+        # the write is committed, a backed up publish buffer must not fail it,
+        # the events are logged in full so they can be replayed by hand, the
+        # batches queued before the buffer filled up are still published
+        try:
+            await self._dispatcher.dispatch(events)
+        except ServiceUnavailableException as e:
+            logged = ", ".join(event.model_dump_json() for event in events)
+            logger.error(f"Committed domain events may be dropped: {e} {logged}")
+            self._metrics.increment("uow_dropped_events_total", len(events))
+
+    async def _invalidate_tags(self, tags: list[str]):
+        # the write is committed, a cache outage must not fail it
+        if not tags:
+            return
+
+        try:
+            await self._cache.invalidate_tags(tags)
+        except Exception as e:
+            logger.error(f"Failed to invalidate cache tags {tags}: {e}")
+            self._metrics.increment("uow_cache_invalidation_errors_total")
+
+    async def _add_emails(self, emails: list[str]):
+        # a missed email only costs a lookup the filter would have skipped
+        if not emails:
+            return
+
+        try:
+            await self._emails.add_many(emails)
+        except Exception as e:
+            logger.error(f"Failed to add {len(emails)} emails to the filter: {e}")
+            self._metrics.increment("uow_bloom_update_errors_total")
+
+    @classmethod
+    def _decorate_defined_commit_method(cls):
         # decorate commit method to auto emit raised domain events
-        commit = getattr(self, "commit")
+        commit = cls.__dict__.get("commit")
+        if commit is None or getattr(commit, "__isabstractmethod__", False):
+            return
 
         @wraps(commit)
-        async def fn(*args, **kwargs):
+        async def fn(self: Uow, *args, **kwargs):
             domain_events = self._collect_events()
-            for event in domain_events:
-                await self._publisher.publish(event.channel, event.data)
+            if self._outbox and domain_events:
+                await self._add_to_outbox(domain_events)
 
             seen_aggs = self._collect_seen_aggregates(clear=True)
+            # inserted users are the ones never committed before
+            new_emails = [
+                agg.email
+                for agg in seen_aggs
+                if isinstance(agg, User) and agg.version == 0
+            ]
             for agg in seen_aggs:
                 agg.version += 1
 
-            await commit(*args, **kwargs)
+            await commit(self, *args, **kwargs)
+
+            try:
+                # only publish once the transaction the events belong to committed
+                if not self._outbox:
+                    await self._dispatch(domain_events)
+            finally:
+                # cached queries over the touched aggregate types are now stale
+                tags = {type(agg).__name__.lower() for agg in seen_aggs}
+                await self._invalidate_tags(sorted(tags))
+                await self._add_emails(new_emails)
 
-        setattr(self, "commit", fn)
+        setattr(cls, "commit", fn)
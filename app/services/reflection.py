@@ -9,7 +9,8 @@ class Reflector:
         methods = []
 
         for func in dir(obj):
-            if callable(getattr(obj, func)):
+            # getattr default covers ABC attributes not set yet at class creation
+            if callable(getattr(obj, func, None)):
                 if startswith and not func.startswith(startswith):
                     continue
 
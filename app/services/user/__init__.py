@@ -1,4 +1,15 @@
 from . import dtos
-from .service import UserCrudService, UserService, UserViewService
+from .service import (
+    UserCrudService,
+    UserEmailFilterService,
+    UserService,
+    UserViewService,
+)
 
-__all__ = ["UserCrudService", "UserService", "UserViewService", "dtos"]
+__all__ = [
+    "UserCrudService",
+    "UserEmailFilterService",
+    "UserService",
+    "UserViewService",
+    "dtos",
+]
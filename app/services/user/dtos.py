@@ -1,5 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class CreateUser(BaseModel):
     email: str
+
+
+class CreateUsers(BaseModel):
+    users: list[CreateUser] = Field(max_length=10_000)
+
+
+class CreatedUser(BaseModel):
+    email: str
+    created: bool
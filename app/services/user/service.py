@@ -1,10 +1,13 @@
+import json
+from collections.abc import AsyncIterator
+
 from kink import inject
 
 from app.domain.models import User
 
 from ..errors import NoResourceException, ResourceExistsException
-from ..ports import Publisher, Query, Uow
-from .dtos import CreateUser
+from ..ports import BloomFilter, Publisher, Query, Uow
+from .dtos import CreatedUser, CreateUser, CreateUsers
 
 
 @inject()
@@ -31,20 +34,70 @@ class UserService:
 @inject()
 class UserCrudService:
     uow: Uow
+    emails: BloomFilter
 
-    def __init__(self, uow: Uow):
+    def __init__(self, uow: Uow, emails: BloomFilter):
         self.uow = uow
+        self.emails = emails
 
     async def create_user(self, create_user: CreateUser):
+        email = create_user.email
         async with self.uow.begin():
-            users = await self.uow.user_repository.find(create_user.email)
-            if users:
+            # new emails skip the lookup, the unique index catches the rest
+            maybe_exists = await self.emails.might_contain(email)
+            if maybe_exists and await self.uow.user_repository.exists(email):
                 raise ResourceExistsException()
 
-            user = User(email=create_user.email)
+            user = User(email=email)
             await self.uow.user_repository.add(user)
             await self.uow.commit()
 
+    async def create_users(self, create_users: CreateUsers) -> list[CreatedUser]:
+        emails = list(dict.fromkeys(user.email for user in create_users.users))
+        contained = await self.emails.might_contain_many(emails)
+        maybe_existing = [email for email, c in zip(emails, contained) if c]
+
+        async with self.uow.begin():
+            existing: set[str] = set()
+            if maybe_existing:
+                existing = await self.uow.user_repository.exists_many(maybe_existing)
+            users = [User(email=email) for email in emails if email not in existing]
+            inserted = await self.uow.user_repository.add_many(users)
+            await self.uow.commit()
+
+        # repeated emails in the batch are only reported as created once
+        created = {user.email for user in inserted}
+        results: list[CreatedUser] = []
+        for create_user in create_users.users:
+            results.append(
+                CreatedUser(
+                    email=create_user.email, created=create_user.email in created
+                )
+            )
+            created.discard(create_user.email)
+
+        return results
+
+
+@inject()
+class UserEmailFilterService:
+    query: Query
+    emails: BloomFilter
+
+    def __init__(self, query: Query, emails: BloomFilter):
+        self.query = query
+        self.emails = emails
+
+    async def load(self, chunk_size: int = 10_000):
+        """Add every existing email to the filter, a shared filter loads once"""
+        if await self.emails.is_loaded():
+            return
+
+        async for emails in self.query.stream_users(chunk_size=chunk_size):
+            await self.emails.add_many(emails)
+
+        await self.emails.set_loaded()
+
 
 @inject()
 class UserViewService:
@@ -59,3 +112,15 @@ class UserViewService:
         limit: int = 50,
     ):
         return await self.query.list_users(skip=skip, limit=limit)
+
+    async def list_users_after(
+        self,
+        after: str | None = None,
+        limit: int = 50,
+    ):
+        return await self.query.list_users_after(after=after, limit=limit)
+
+    async def export_users(self, chunk_size: int = 1000) -> AsyncIterator[str]:
+        # one NDJSON chunk per database chunk
+        async for emails in self.query.stream_users(chunk_size=chunk_size):
+            yield "".join(json.dumps({"email": email}) + "\n" for email in emails)
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from nats.js.errors import NoStreamResponseError
+
+from app.infra.nats.jetstream import JetStreamEventPublisher
+from app.infra.nats.publisher import NatsConnection
+
+
+class TestJetStreamPublisher:
+    connection: NatsConnection
+    publisher: JetStreamEventPublisher
+
+    @pytest.fixture(autouse=True)
+    async def set_up(self):
+        self.connection = NatsConnection()
+        await self.connection.connect()
+        self.js = self.connection.nc.jetstream()
+        await self.js.add_stream(name="jetstream_test", subjects=["jetstream_test.>"])
+        self.publisher = JetStreamEventPublisher(self.connection)
+
+        yield
+
+        await self.js.delete_stream("jetstream_test")
+        await self.connection.close()
+
+    async def test_publish_is_stored(self):
+        await self.publisher.publish("jetstream_test.event", {"field": "bar"})
+
+        info = await self.js.stream_info("jetstream_test")
+        assert info.state.messages == 1
+
+    async def test_publish_many_stores_every_event_in_order(self):
+        await self.publisher.publish_many(
+            [
+                {"channel": "jetstream_test.event", "payload": str(i)}
+                for i in range(1000)
+            ]
+        )
+
+        info = await self.js.stream_info("jetstream_test")
+        assert info.state.messages == 1000
+        first = await self.js.get_msg("jetstream_test", info.state.first_seq)
+        last = await self.js.get_msg("jetstream_test", info.state.last_seq)
+        assert (first.data, last.data) == (b"0", b"999")
+
+    async def test_publish_without_stream_raises(self):
+        with pytest.raises(NoStreamResponseError):
+            await self.publisher.publish("no_stream.event", "test")
+
+        assert self.publisher._acks == {}
+
+    async def test_full_window_times_out(self):
+        self.publisher._window = asyncio.Semaphore(0)
+        self.publisher._ack_timeout = 0.1
+
+        with pytest.raises(TimeoutError):
+            await self.publisher.publish("jetstream_test.event", "test")
+
+        assert self.publisher._acks == {}
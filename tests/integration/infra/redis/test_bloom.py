@@ -0,0 +1,35 @@
+import pytest
+
+from app.infra.redis.bloom import RedisBloomFilter, RedisConnection
+
+
+class TestRedisBloomFilter:
+    bloom: RedisBloomFilter
+
+    @pytest.fixture(autouse=True)
+    async def set_up(self):
+        connection = RedisConnection()
+        await connection.connect()
+
+        self.bloom = RedisBloomFilter(connection, capacity=1_000, error_rate=0.01)
+        await self.bloom.rc.delete(self.bloom._key, self.bloom._loaded_key)
+
+        yield
+
+        await self.bloom.rc.delete(self.bloom._key, self.bloom._loaded_key)
+        await connection.close()
+
+    async def test_answers_maybe_until_loaded(self):
+        assert await self.bloom.might_contain("email@gmail.com") is True
+
+        await self.bloom.set_loaded()
+
+        assert await self.bloom.is_loaded() is True
+        assert await self.bloom.might_contain("email@gmail.com") is False
+
+    async def test_has_no_false_negatives(self):
+        emails = [f"email{i}@gmail.com" for i in range(1_000)]
+        await self.bloom.add_many(emails)
+        await self.bloom.set_loaded()
+
+        assert all(await self.bloom.might_contain_many(emails))
@@ -28,18 +28,18 @@ class TestRedisCache:
     async def test_can_cache_value(self):
         await self.cache.set("service", "service_name")
         res = await self.cache.get("service")
-        assert res == "service_name"
+        assert res == b"service_name"
 
     async def test_can_cache_values(self):
         await self.cache.multi_set(
             {"service": "service_name", "name": "developer", "company": "trellis"}
         )
         res = await self.cache.get("service")
-        assert res == "service_name"
+        assert res == b"service_name"
         res = await self.cache.get("name")
-        assert res == "developer"
+        assert res == b"developer"
         res = await self.cache.get("company")
-        assert res == "trellis"
+        assert res == b"trellis"
 
     async def test_can_delete_value(self):
         await self.cache.set("service", "service_name")
@@ -58,3 +58,43 @@ class TestRedisCache:
         assert res is None
         res = await self.cache.get("company")
         assert res is None
+
+    async def test_lock_is_exclusive(self):
+        await self.cache.delete("lock")
+        token = await self.cache.acquire_lock("lock", 10)
+        assert token is not None
+        assert await self.cache.acquire_lock("lock", 10) is None
+
+        assert await self.cache.release_lock("lock", "other") is False
+        assert await self.cache.release_lock("lock", token) is True
+        assert await self.cache.acquire_lock("lock", 10) is not None
+        await self.cache.delete("lock")
+
+    async def test_can_increment_value(self):
+        await self.cache.delete("counter")
+        assert await self.cache.incr("counter") == 1
+        assert await self.cache.incr("counter") == 2
+        await self.cache.delete("counter")
+
+    async def test_can_cache_encoded_value(self):
+        await self.cache.set_value("service", {"name": "service_name"})
+        res = await self.cache.get_value("service")
+        assert res == {"name": "service_name"}
+
+    async def test_can_set_values_with_ttl(self):
+        await self.cache.multi_set({"service": "service_name", "name": "developer"}, 60)
+
+        assert 0 < await self.cache.rc.ttl("service") <= 60
+        assert 0 < await self.cache.rc.ttl("name") <= 60
+        await self.cache.multi_delete(["service", "name"])
+
+    async def test_pipeline_runs_operations_in_chunks(self):
+        self.cache._chunk_size = 2
+        await self.cache.multi_delete(["service", "counter"])
+
+        async with self.cache.pipeline() as pipe:
+            pipe.set("service", "service_name", 60).incr("counter").incr("counter")
+            pipe.get("service").delete("counter")
+
+        assert pipe.results == [True, 1, 2, b"service_name", True]
+        await self.cache.delete("service")
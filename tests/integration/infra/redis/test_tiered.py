@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from app.infra.redis.cache import RedisCache, RedisConnection
+from app.infra.redis.tiered import TieredCache
+
+
+class TestTieredCache:
+    cache: TieredCache
+    other: TieredCache
+
+    @pytest.fixture(autouse=True)
+    async def set_up(self):
+        connection = RedisConnection()
+        await connection.connect()
+
+        # two pods sharing the same redis
+        self.cache = TieredCache(connection, RedisCache(connection))
+        self.other = TieredCache(connection, RedisCache(connection))
+
+        yield
+
+        await self.cache.multi_delete(["service", "name"])
+        await connection.close()
+
+    async def test_hits_are_served_locally(self):
+        await self.cache.set("service", "service_name")
+        await self.cache.get("service")
+
+        await self.cache.remote.set("service", "changed")
+        res = await self.cache.get("service")
+        assert res == b"service_name"
+
+    async def test_writes_invalidate_other_pods(self):
+        await self.cache.set("service", "service_name")
+        await self.other.get("service")
+        await asyncio.sleep(0.1)  # let both listeners subscribe
+
+        await self.cache.set("service", "changed")
+        await asyncio.sleep(0.1)
+
+        assert "service" not in self.other.local
+        res = await self.other.get("service")
+        assert res == b"changed"
+
+    async def test_local_tier_is_bounded(self):
+        self.cache._size = 1
+        await self.cache.multi_set({"service": "service_name", "name": "developer"})
+        await self.cache.multi_get(["service", "name"])
+
+        assert list(self.cache.local) == ["name"]
+
+    async def test_local_entries_expire(self):
+        self.cache._ttl = 0.05
+        await self.cache.set("service", "service_name")
+        await self.cache.get("service")
+        await asyncio.sleep(0.1)
+
+        await self.cache.remote.set("service", "changed")
+        res = await self.cache.get("service")
+        assert res == b"changed"
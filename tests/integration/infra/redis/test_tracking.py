@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app.infra.redis.cache import RedisCache, RedisConnection
+
+
+class TestRedisClientTracking:
+    cache: RedisCache
+    writer: RedisCache
+
+    @pytest.fixture(autouse=True)
+    async def set_up(self, monkeypatch):
+        monkeypatch.setenv("REDIS_CLIENT_TRACKING", "true")
+        monkeypatch.setenv("REDIS_TRACKING_MAX_KEYS", "2")
+        connection = RedisConnection()
+        await connection.connect()
+
+        self.cache = RedisCache(connection)
+        # another pod writing to the same redis
+        monkeypatch.setenv("REDIS_CLIENT_TRACKING", "false")
+        self.writer = RedisCache(connection)
+
+        await self.writer.set("service", "service_name")
+        await self.cache.get("service")
+        await asyncio.sleep(0.1)  # let the listener subscribe
+
+        yield
+
+        await self.writer.multi_delete(["service", "name", "company"])
+        await connection.close()
+
+    async def test_repeated_gets_are_served_locally(self):
+        await self.cache.get("service")
+        res = await self.cache.get("service")
+
+        assert res == b"service_name"
+        assert self.cache._tracking.stats["hits"] == 1  # type: ignore
+
+    async def test_writes_elsewhere_invalidate_local_values(self):
+        await self.cache.get("service")
+
+        await self.writer.set("service", "changed")
+        await asyncio.sleep(0.1)
+
+        res = await self.cache.get("service")
+        assert res == b"changed"
+        assert self.cache._tracking.stats["invalidations"] >= 1  # type: ignore
+
+    async def test_local_values_are_capped(self):
+        await self.writer.multi_set({"name": "developer", "company": "trellis"})
+        await self.cache.multi_get(["service", "name", "company"])
+
+        assert list(self.cache._tracking.local) == ["name", "company"]  # type: ignore
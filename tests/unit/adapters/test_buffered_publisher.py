@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+import pytest
+
+from app.infra.buffered.publisher import BufferedPublisher
+from app.infra.memory.metrics import InMemoryMetrics
+from app.infra.memory.publisher import InMemoryEventPublisher
+from app.services.errors import ServiceUnavailableException
+
+
+class StalledPublisher(InMemoryEventPublisher):
+    def __init__(self):
+        super().__init__()
+        self.available = asyncio.Event()
+
+    async def publish(self, channel, payload):
+        await self.available.wait()
+        await super().publish(channel, payload)
+
+
+class TestBufferedPublisher:
+    inner: StalledPublisher
+    metrics: InMemoryMetrics
+
+    @pytest.fixture(autouse=True)
+    def set_up(self, tmp_path):
+        self.inner = StalledPublisher()
+        self.metrics = InMemoryMetrics()
+        self.spill_path = str(tmp_path / "spill.jsonl")
+
+    def buffered(self, policy, size=2) -> BufferedPublisher:
+        return BufferedPublisher(
+            self.inner,
+            self.metrics,
+            size=size,
+            policy=policy,
+            timeout=0.01,
+            spill_path=self.spill_path,
+            batch_size=1,
+        )
+
+    async def test_publishes_in_the_background(self):
+        self.inner.available.set()
+        publisher = self.buffered("block")
+
+        await publisher.publish("event", "test")
+        await publisher.close()
+
+        assert self.inner.published_messages == [
+            {"channel": "event", "payload": "test"}
+        ]
+        assert self.metrics.gauges[self.metrics.key("publisher_buffer_depth")] == 0
+
+    async def test_block_fails_once_the_timeout_passed(self):
+        publisher = self.buffered("block")
+
+        await publisher.publish_many(
+            [{"channel": "event", "payload": str(i)} for i in range(3)]
+        )  # one is in flight, two are queued
+        with pytest.raises(ServiceUnavailableException):
+            await publisher.publish("event", "3")
+
+        dropped = self.metrics.key(
+            "publisher_buffer_dropped_total", {"reason": "timeout"}
+        )
+        assert self.metrics.counters[dropped] == 1
+        self.inner.available.set()
+        await publisher.close()
+        assert len(self.inner.published_messages) == 3
+
+    async def test_block_queues_none_of_a_batch_that_timed_out(self):
+        publisher = self.buffered("block")
+
+        await publisher.publish("event", "0")
+        await asyncio.sleep(0)  # in flight
+        await publisher.publish("event", "1")
+        with pytest.raises(ServiceUnavailableException):
+            await publisher.publish_many(
+                [{"channel": "event", "payload": str(i)} for i in range(2, 4)]
+            )
+
+        assert list(publisher.queue) == [{"channel": "event", "payload": "1"}]
+        dropped = self.metrics.key(
+            "publisher_buffer_dropped_total", {"reason": "timeout"}
+        )
+        assert self.metrics.counters[dropped] == 2
+        self.inner.available.set()
+        await publisher.close()
+        assert [m["payload"] for m in self.inner.published_messages] == ["0", "1"]
+
+    async def test_drop_oldest_keeps_the_newest_events(self):
+        publisher = self.buffered("drop-oldest")
+
+        await publisher.publish("event", "0")
+        await asyncio.sleep(0)  # taken by the flusher
+        await publisher.publish_many(
+            [{"channel": "event", "payload": str(i)} for i in range(1, 5)]
+        )
+
+        assert [event["payload"] for event in publisher.queue] == ["3", "4"]
+        dropped = self.metrics.key("publisher_buffer_dropped_total", {"reason": "full"})
+        assert self.metrics.counters[dropped] == 2
+        self.inner.available.set()
+        await publisher.close()
+        assert [m["payload"] for m in self.inner.published_messages] == ["0", "3", "4"]
+
+    async def test_spill_replays_events_once_drained(self):
+        publisher = self.buffered("spill")
+
+        await publisher.publish("event", "0")
+        await asyncio.sleep(0)  # taken by the flusher
+        await publisher.publish_many(
+            [{"channel": "event", "payload": str(i)} for i in range(1, 4)]
+        )
+
+        with open(self.spill_path) as file:
+            assert [json.loads(line)["payload"] for line in file] == ["3"]
+        self.inner.available.set()
+        await publisher.close()
+        assert [m["payload"] for m in self.inner.published_messages] == [
+            "0",
+            "1",
+            "2",
+            "3",
+        ]
+
+    async def test_close_spills_what_is_left(self):
+        publisher = self.buffered("spill")
+
+        await publisher.publish_many(
+            [{"channel": "event", "payload": str(i)} for i in range(2)]
+        )
+        await publisher.close(timeout=0.01)
+
+        with open(self.spill_path) as file:
+            assert [json.loads(line)["payload"] for line in file] == ["0", "1"]
+
+    async def test_start_replays_a_previous_spill(self):
+        self.inner.available.set()
+        with open(self.spill_path, "w") as file:
+            file.write(json.dumps({"channel": "event", "payload": "0"}) + "\n")
+        publisher = self.buffered("spill")
+
+        publisher.start()
+        await publisher.close()
+
+        assert [m["payload"] for m in self.inner.published_messages] == ["0"]
+
+    async def test_zero_timeout_is_not_replaced_by_default(self):
+        publisher = BufferedPublisher(self.inner, self.metrics, size=1, timeout=0)
+
+        assert (publisher.size, publisher.timeout) == (1, 0)
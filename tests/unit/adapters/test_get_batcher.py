@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.infra.redis.batcher import GetBatcher
+
+
+class TestGetBatcher:
+    calls: list[list[str]]
+    store: dict[str, str]
+
+    @pytest.fixture(autouse=True)
+    def set_up(self):
+        self.calls = []
+        self.store = {"service": "service_name", "name": "developer"}
+
+    async def multi_get(self, keys: list[str]) -> list[str | None]:
+        self.calls.append(keys)
+        await asyncio.sleep(0)
+        return [self.store.get(key) for key in keys]
+
+    async def test_gets_of_the_same_tick_share_one_multi_get(self):
+        batcher = GetBatcher(self.multi_get)
+
+        results = await asyncio.gather(
+            batcher.get("service"), batcher.get("name"), batcher.get("company")
+        )
+
+        assert results == ["service_name", "developer", None]
+        assert self.calls == [["service", "name", "company"]]
+
+    async def test_identical_keys_are_fetched_once(self):
+        batcher = GetBatcher(self.multi_get)
+
+        results = await asyncio.gather(*(batcher.get("service") for _ in range(10)))
+
+        assert results == ["service_name"] * 10
+        assert self.calls == [["service"]]
+
+    async def test_window_collects_gets_across_ticks(self):
+        batcher = GetBatcher(self.multi_get, window=0.05)
+
+        async def later(key: str):
+            await asyncio.sleep(0.01)
+            return await batcher.get(key)
+
+        await asyncio.gather(batcher.get("service"), later("name"))
+
+        assert self.calls == [["service", "name"]]
+
+    async def test_full_batch_is_sent_right_away(self):
+        batcher = GetBatcher(self.multi_get, window=10, max_batch=2)
+
+        await asyncio.wait_for(
+            asyncio.gather(batcher.get("service"), batcher.get("name")), 1
+        )
+
+        assert self.calls == [["service", "name"]]
+
+    async def test_errors_reach_every_caller(self):
+        async def failing(keys: list[str]) -> list[str | None]:
+            raise ConnectionError()
+
+        batcher = GetBatcher(failing)
+
+        results = await asyncio.gather(
+            batcher.get("service"), batcher.get("name"), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+    async def test_cancelled_fetch_cancels_callers(self):
+        started = asyncio.Event()
+
+        async def stalled(keys: list[str]) -> list[str | None]:
+            started.set()
+            await asyncio.Event().wait()
+            return []
+
+        batcher = GetBatcher(stalled)
+        get = asyncio.ensure_future(batcher.get("service"))
+        await started.wait()
+
+        for batch in batcher._batches:
+            batch.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(get, 1)
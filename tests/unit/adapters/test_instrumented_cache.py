@@ -0,0 +1,53 @@
+import pytest
+
+from app.infra.instrumented.cache import InstrumentedCache
+from app.infra.memory.cache import InMemoryCache
+from app.infra.memory.metrics import InMemoryMetrics
+
+
+class TestInstrumentedCache:
+    cache: InstrumentedCache
+    metrics: InMemoryMetrics
+
+    @pytest.fixture(autouse=True)
+    def set_up(self):
+        self.metrics = InMemoryMetrics()
+        self.cache = InstrumentedCache(InMemoryCache(), self.metrics)
+
+    async def test_counts_hits_and_misses_per_key_prefix(self):
+        await self.cache.set("__port:Query:list_users:limit=50", "[]")
+        await self.cache.get("__port:Query:list_users:limit=50")
+        await self.cache.multi_get(
+            ["__port:Query:list_users:limit=10", "__port:Query:list_users:limit=50"]
+        )
+
+        prefix = {"prefix": "__port:Query:list_users"}
+        assert self.metrics.counters[self.metrics.key("cache_hits_total", prefix)] == 2
+        assert (
+            self.metrics.counters[self.metrics.key("cache_misses_total", prefix)] == 1
+        )
+
+    async def test_times_each_operation(self):
+        await self.cache.set("service", "service_name")
+        await self.cache.get("service")
+        await self.cache.delete("service")
+
+        for operation in ("set", "get", "delete"):
+            key = self.metrics.key("cache_operation_seconds", {"operation": operation})
+            assert len(self.metrics.observations[key]) == 1
+
+    async def test_records_value_sizes(self):
+        await self.cache.set("service", "x" * 100)
+        await self.cache.get("service")
+
+        for operation in ("set", "get"):
+            key = self.metrics.key(
+                "cache_value_bytes", {"operation": operation, "prefix": "service"}
+            )
+            assert self.metrics.observations[key] == [100]
+
+    async def test_pipeline_uses_wrapped_cache(self):
+        async with self.cache.pipeline() as pipe:
+            pipe.set("service", "service_name")
+
+        assert await self.cache.inner.get("service") == "service_name"
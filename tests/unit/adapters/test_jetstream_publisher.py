@@ -0,0 +1,72 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.infra.nats.jetstream import JetStreamEventPublisher
+
+
+class FakeClient:
+    """Acks every publish after `ack_delay`, none when it is None"""
+
+    def __init__(self, ack_delay: float | None = 0.005):
+        self.ack_delay = ack_delay
+        self.published: list[bytes] = []
+        self._on_ack = None
+
+    def new_inbox(self) -> str:
+        return "_INBOX.test"
+
+    async def subscribe(self, subject: str, cb):
+        self._on_ack = cb
+
+    async def publish(self, subject: str, payload: bytes, reply: str):
+        self.published.append(payload)
+        if self.ack_delay is not None:
+            asyncio.get_running_loop().call_later(
+                self.ack_delay, lambda: asyncio.ensure_future(self._ack(reply))
+            )
+
+    async def _ack(self, reply: str):
+        assert self._on_ack is not None
+        data = json.dumps({"stream": "events", "seq": len(self.published)}).encode()
+        await self._on_ack(SimpleNamespace(subject=reply, headers=None, data=data))
+
+
+class TestJetStreamPublisher:
+    def publisher(self, nc: FakeClient, window: int, timeout: float):
+        publisher = JetStreamEventPublisher(SimpleNamespace(nc=nc))  # type: ignore
+        publisher._window = asyncio.Semaphore(window)
+        publisher._ack_timeout = timeout
+        return publisher
+
+    async def test_large_batch_outlasting_the_timeout_succeeds(self):
+        nc = FakeClient()
+        # 20 rounds of prompt acks take longer than one timeout
+        publisher = self.publisher(nc, window=10, timeout=0.05)
+
+        await publisher.publish_many(
+            [{"channel": "event", "payload": str(i)} for i in range(200)]
+        )
+
+        assert len(nc.published) == 200
+        assert publisher._acks == {}
+        assert publisher._window._value == 10
+
+    async def test_missing_ack_times_out_and_frees_its_slot(self):
+        publisher = self.publisher(FakeClient(ack_delay=None), window=1, timeout=0.05)
+
+        with pytest.raises(TimeoutError):
+            await publisher.publish("event", "test")
+
+        assert publisher._acks == {}
+        assert publisher._window._value == 1
+
+    async def test_full_window_times_out(self):
+        publisher = self.publisher(FakeClient(), window=0, timeout=0.05)
+
+        with pytest.raises(TimeoutError):
+            await publisher.publish("event", "test")
+
+        assert publisher._acks == {}
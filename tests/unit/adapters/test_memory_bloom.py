@@ -0,0 +1,34 @@
+import pytest
+
+from app.infra.memory.bloom import InMemoryBloomFilter
+
+
+class TestInMemoryBloomFilter:
+    bloom: InMemoryBloomFilter
+
+    @pytest.fixture(autouse=True)
+    def set_up(self):
+        self.bloom = InMemoryBloomFilter(capacity=1_000, error_rate=0.01)
+
+    async def test_answers_maybe_until_loaded(self):
+        assert await self.bloom.might_contain("email@gmail.com") is True
+
+        await self.bloom.set_loaded()
+
+        assert await self.bloom.might_contain("email@gmail.com") is False
+
+    async def test_has_no_false_negatives(self):
+        emails = [f"email{i}@gmail.com" for i in range(1_000)]
+        await self.bloom.add_many(emails)
+        await self.bloom.set_loaded()
+
+        assert all(await self.bloom.might_contain_many(emails))
+
+    async def test_false_positive_rate_is_near_error_rate(self):
+        await self.bloom.add_many([f"email{i}@gmail.com" for i in range(1_000)])
+        await self.bloom.set_loaded()
+
+        others = [f"other{i}@gmail.com" for i in range(10_000)]
+        positives = sum(await self.bloom.might_contain_many(others))
+
+        assert positives / len(others) < 0.03
@@ -1,5 +1,8 @@
+import asyncio
+
 import pytest
 
+from app.config import config
 from app.infra.memory.cache import InMemoryCache
 
 
@@ -54,3 +57,129 @@ class TestInMemoryCache:
         assert res is None
         res = await self.cache.get("company")
         assert res is None
+
+    async def test_lock_is_exclusive(self):
+        token = await self.cache.acquire_lock("lock", 10)
+        assert token is not None
+        assert await self.cache.acquire_lock("lock", 10) is None
+
+        assert await self.cache.release_lock("lock", "other") is False
+        assert await self.cache.release_lock("lock", token) is True
+        assert await self.cache.acquire_lock("lock", 10) is not None
+
+    async def test_lock_expires(self):
+        token = await self.cache.acquire_lock("lock", 0.05)
+        await asyncio.sleep(0.1)
+
+        assert await self.cache.release_lock("lock", token) is False
+        assert await self.cache.acquire_lock("lock", 10) is not None
+
+    async def test_invalidating_tags_bumps_versions(self):
+        assert await self.cache.tag_versions(["user", "order"]) == [0, 0]
+
+        await self.cache.invalidate_tags(["user"])
+
+        assert await self.cache.tag_versions(["user", "order"]) == [1, 0]
+
+    async def test_can_cache_encoded_value(self):
+        await self.cache.set_value("service", {"name": "service_name"})
+
+        assert isinstance(self.cache.store["service"], bytes)
+        res = await self.cache.get_value("service")
+        assert res == {"name": "service_name"}
+
+    async def test_undecodable_value_is_a_miss_and_dropped(self):
+        await self.cache.set("query", b"\xff{}")
+
+        assert await self.cache.get_value("query") is None
+        assert "query" not in self.cache.store
+
+    async def test_codec_follows_config(self, monkeypatch):
+        monkeypatch.setattr(config, "CACHE_COMPRESSION_THRESHOLD", 10)
+
+        assert InMemoryCache().codec.threshold == 10
+
+    async def test_values_expire_without_tasks(self):
+        tasks = len(asyncio.all_tasks())
+        await self.cache.set("service", "service_name", ttl=0.05)  # type: ignore
+        assert len(asyncio.all_tasks()) == tasks
+
+        await asyncio.sleep(0.1)
+
+        assert await self.cache.get("service") is None
+        assert self.cache.stats["expirations"] == 1
+        assert self.cache.store == {}
+
+    async def test_overwriting_value_resets_ttl(self):
+        await self.cache.set("service", "service_name", ttl=0.05)  # type: ignore
+        await self.cache.set("service", "service_name")
+        await asyncio.sleep(0.1)
+
+        assert await self.cache.get("service") == "service_name"
+
+    async def test_evicts_least_recently_used_over_max_entries(self):
+        cache = InMemoryCache(max_entries=2)
+        await cache.set("service", "service_name")
+        await cache.set("name", "developer")
+        await cache.get("service")
+
+        await cache.set("company", "trellis")
+
+        assert list(cache.store) == ["service", "company"]
+        assert cache.stats["evictions"] == 1
+
+    async def test_evicts_over_max_bytes(self):
+        cache = InMemoryCache(max_bytes=100)
+        await cache.set("first", "x" * 60)
+        await cache.set("second", "x" * 30)
+
+        assert list(cache.store) == ["second"]
+        assert cache.stats["bytes"] == len("second") + 30
+
+    async def test_measures_encoded_bytes(self):
+        await self.cache.set("clé", "café")
+
+        assert self.cache.stats["bytes"] == len("clé".encode()) + len("café".encode())
+
+    async def test_does_not_evict_held_locks(self):
+        cache = InMemoryCache(max_entries=2)
+        token = await cache.acquire_lock("lock", ttl=10)
+        await cache.set("service", "service_name")
+        await cache.set("name", "developer")
+
+        assert list(cache.store) == ["lock", "name"]
+        assert await cache.release_lock("lock", token) is True  # type: ignore
+
+    async def test_internal_lookups_are_not_counted(self):
+        token = await self.cache.acquire_lock("lock", ttl=10)
+        await self.cache.acquire_lock("lock", ttl=10)
+        await self.cache.release_lock("lock", token)  # type: ignore
+        await self.cache.incr("counter")
+
+        stats = self.cache.stats
+        assert (stats["hits"], stats["misses"]) == (0, 0)
+
+    async def test_tracks_hit_ratio(self):
+        await self.cache.set("service", "service_name")
+        await self.cache.get("service")
+        await self.cache.get("name")
+
+        stats = self.cache.stats
+        assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+    async def test_can_set_values_with_ttl(self):
+        await self.cache.multi_set(
+            {"service": "service_name", "name": "developer"},
+            ttl=0.05,  # type: ignore
+        )
+        await asyncio.sleep(0.1)
+
+        assert await self.cache.multi_get(["service", "name"]) == [None, None]
+
+    async def test_pipeline_runs_operations_on_exit(self):
+        async with self.cache.pipeline() as pipe:
+            pipe.set("service", "service_name").incr("counter").get("service")
+            pipe.delete("name")
+            assert self.cache.store == {}
+
+        assert pipe.results == [True, 1, "service_name", False]
@@ -1,9 +1,14 @@
+import json
+import math
+
 import pytest
+from sqlalchemy import insert
 
 from app.domain import models
 from app.infra.memory.cache import InMemoryCache
 from app.infra.memory.publisher import InMemoryEventPublisher
 from app.infra.sqlalchemy.query import SqlAlchemyQuery
+from app.infra.sqlalchemy.tables import metadata, user
 from app.infra.sqlalchemy.uow import SqlAlchemyUow, SqlConnection
 
 
@@ -27,6 +32,21 @@ class TestInMemoryDb:
     async def test_can_insert_model(self):
         await self._seed_model("another_email@gmail.com")
 
+    async def test_can_insert_many_models(self):
+        async with self.uow:
+            users = [
+                models.User(email="email@gmail.com"),
+                models.User(email="another_email@gmail.com"),
+            ]
+            inserted = await self.uow.user_repository.add_many(users)
+            assert inserted == users[1:]
+            assert self.uow.user_repository.seen == set(users[1:])
+            await self.uow.commit()
+
+        async with self.uow:
+            users = await self.uow.user_repository.find("another_email@gmail.com")
+            assert users[0].version == 1
+
     async def test_can_select_model(self):
         async with self.uow:
             users = await self.uow.user_repository.find(email="email@gmail.com")
@@ -34,6 +54,32 @@ class TestInMemoryDb:
             user = users[0]
             assert user.email == "email@gmail.com"
 
+    async def test_can_select_many_models(self):
+        await self._seed_model("another_email@gmail.com")
+
+        async with self.uow:
+            users = await self.uow.user_repository.find_many(
+                ["email@gmail.com", "another_email@gmail.com", "missing@gmail.com"]
+            )
+            assert {user.email for user in users} == {
+                "email@gmail.com",
+                "another_email@gmail.com",
+            }
+            assert set(users) == self.uow.user_repository.seen
+
+    async def test_can_check_model_exists(self):
+        async with self.uow:
+            assert await self.uow.user_repository.exists("email@gmail.com") is True
+            assert await self.uow.user_repository.exists("missing@gmail.com") is False
+            assert self.uow.user_repository.seen == set()
+
+    async def test_can_check_many_models_exist(self):
+        async with self.uow:
+            existing = await self.uow.user_repository.exists_many(
+                ["email@gmail.com", "missing@gmail.com"]
+            )
+            assert existing == {"email@gmail.com"}
+
     async def test_can_list_models(self):
         users = await self.query.list_users()
         assert len(users) == 1
@@ -48,6 +94,41 @@ class TestInMemoryDb:
         users = await self.query.list_users()
         assert users == []
 
+    async def test_can_remove_many_models(self):
+        await self._seed_model("another_email@gmail.com")
+
+        async with self.uow:
+            removed_users = await self.uow.user_repository.remove_many(
+                ["email@gmail.com", "another_email@gmail.com"]
+            )
+            assert len(removed_users) == 2
+            assert set(removed_users) == self.uow.user_repository.seen
+            await self.uow.commit()
+
+        users = await self.query.list_users()
+        assert users == []
+
+    async def test_can_remove_loaded_model(self):
+        async with self.uow:
+            users = await self.uow.user_repository.find("email@gmail.com")
+            removed_users = await self.uow.user_repository.remove("email@gmail.com")
+            assert removed_users == users
+            await self.uow.commit()
+
+        async with self.uow:
+            assert await self.uow.user_repository.exists("email@gmail.com") is False
+
+    async def test_can_remove_model_without_delete_returning(self, mocker):
+        async with self.uow:
+            dialect = self.uow._session.bind.dialect
+            mocker.patch.object(dialect, "delete_returning", False)
+            removed_users = await self.uow.user_repository.remove("email@gmail.com")
+            assert removed_users[0].email == "email@gmail.com"
+            await self.uow.commit()
+
+        async with self.uow:
+            assert await self.uow.user_repository.exists("email@gmail.com") is False
+
     async def test_can_rollback(self):
         async with self.uow:
             user = models.User(email="another_email@gmail.com")
@@ -86,3 +167,59 @@ class TestInMemoryDb:
             await self.uow.user_repository.add(user)
             await self.uow.commit()
             await self.uow.commit()
+
+
+class TestReadReplicas:
+    connection: SqlConnection
+    uow: SqlAlchemyUow
+    query: SqlAlchemyQuery
+
+    @pytest.fixture(autouse=True)
+    async def set_up(self, monkeypatch, tmp_path):
+        replica_urls = [
+            f"sqlite+aiosqlite:///{tmp_path / "replica-0.db"}",
+            f"sqlite+aiosqlite:///{tmp_path / "replica-1.db"}",
+        ]
+        monkeypatch.setenv("DB_REPLICA_URLS", json.dumps(replica_urls))
+
+        self.connection = SqlConnection()
+        await self.connection.connect()
+        self.uow = SqlAlchemyUow(self.connection, InMemoryEventPublisher())
+        self.query = SqlAlchemyQuery(self.connection, InMemoryCache())
+
+        # replicas don't replicate in tests, seed them directly
+        for i, engine in enumerate(self.connection.replica_engines):
+            async with engine.begin() as conn:
+                await conn.run_sync(metadata.create_all)
+                await conn.execute(insert(user), {"email": f"replica{i}@gmail.com"})
+
+        yield
+
+        await self.connection.close(cleanup=True)
+
+    async def test_queries_read_from_replicas_in_turn(self):
+        first = [chunk async for chunk in self.query.stream_users()]
+        second = [chunk async for chunk in self.query.stream_users()]
+
+        assert first == [["replica0@gmail.com"]]
+        assert second == [["replica1@gmail.com"]]
+
+    async def test_uow_writes_to_primary(self):
+        async with self.uow:
+            await self.uow.user_repository.add(models.User(email="email@gmail.com"))
+            await self.uow.commit()
+
+        async with self.uow:
+            assert await self.uow.user_repository.exists("email@gmail.com") is True
+            assert await self.uow.user_repository.exists("replica0@gmail.com") is False
+
+    async def test_lagging_replicas_fall_back_to_primary(self):
+        self.connection._replica_lags = [math.inf, math.inf]
+
+        assert self.connection.read_engine() is self.connection.default_engine
+
+    async def test_lagging_replica_is_skipped(self):
+        self.connection._replica_lags = [math.inf, 0]
+
+        assert self.connection.read_engine() is self.connection.replica_engines[1]
+        assert self.connection.read_engine() is self.connection.replica_engines[1]
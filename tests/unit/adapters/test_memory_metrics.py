@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.infra.memory.metrics import InMemoryMetrics
+from app.infra.sqlalchemy.pool import instrumented_pool
+
+
+class TestInMemoryMetrics:
+    metrics: InMemoryMetrics
+
+    @pytest.fixture(autouse=True)
+    def set_up(self):
+        self.metrics = InMemoryMetrics()
+
+    def test_can_increment_counter(self):
+        self.metrics.increment("hits", labels={"prefix": "users"})
+        self.metrics.increment("hits", 2, labels={"prefix": "users"})
+
+        assert self.metrics.counters[self.metrics.key("hits", {"prefix": "users"})] == 3
+
+    def test_can_set_gauge(self):
+        self.metrics.set("depth", 3)
+        self.metrics.set("depth", 1)
+
+        assert self.metrics.gauges[self.metrics.key("depth")] == 1
+
+    def test_can_observe_histogram(self):
+        self.metrics.observe("latency", 0.1)
+        self.metrics.observe("latency", 0.3)
+
+        assert self.metrics.observations[self.metrics.key("latency")] == [0.1, 0.3]
+
+    def test_gathers_and_resets_metrics(self):
+        self.metrics.increment("hits", labels={"prefix": "users"})
+        self.metrics.observe("latency", 0.5)
+
+        assert self.metrics.gather_current_metrics() == "\n".join(
+            ['hits{prefix="users"} 1', "latency_count 1", "latency_sum 0.5"]
+        )
+
+        self.metrics.reset_metrics()
+        assert self.metrics.gather_current_metrics() == ""
+
+    async def test_instrumented_pool_reports_usage(self, tmp_path):
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / "pool.db"}",
+            poolclass=instrumented_pool(self.metrics, "primary"),
+            pool_size=1,
+            max_overflow=1,
+        )
+        labels = {"pool": "primary"}
+
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            assert (
+                self.metrics.gauges[self.metrics.key("db_pool_checked_out", labels)]
+                == 2
+            )
+            assert (
+                self.metrics.gauges[self.metrics.key("db_pool_overflow", labels)] == 1
+            )
+
+        assert self.metrics.gauges[self.metrics.key("db_pool_checked_out", labels)] == 0
+        assert (
+            len(
+                self.metrics.observations[
+                    self.metrics.key("db_pool_checkout_wait_seconds", labels)
+                ]
+            )
+            == 2
+        )
+
+        await engine.dispose()
@@ -28,3 +28,16 @@ class TestInMemoryPublisher:
             "channel": "event",
             "payload": payload,
         }
+
+    async def test_can_publish_many_events_in_order(self):
+        await self.publisher.publish_many(
+            [
+                {"channel": "first", "payload": "test"},
+                {"channel": "second", "payload": {"field": "bar"}},
+            ]
+        )
+
+        assert self.publisher.published_messages == [
+            {"channel": "first", "payload": "test"},
+            {"channel": "second", "payload": {"field": "bar"}},
+        ]
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+from nats.js.api import StreamConfig
+
+from app.domain.event import Payload
+from app.entrypoints.brokers.nats.consumer import NatsConsumer, decode
+
+
+class FakeMsg:
+    def __init__(self, subject: str, payload: Payload, delivered: int = 1):
+        self.subject = subject
+        self.data = (
+            json.dumps(payload) if isinstance(payload, dict) else payload
+        ).encode()
+        self.metadata = SimpleNamespace(num_delivered=delivered)
+        self.acked = False
+        self.naked = False
+        self.nak_delay: float | None = None
+        self.termed = False
+
+    async def ack(self):
+        self.acked = True
+
+    async def nak(self, delay: float | None = None):
+        self.naked = True
+        self.nak_delay = delay
+
+    async def term(self):
+        self.termed = True
+
+
+class TestNatsConsumer:
+    consumer: NatsConsumer
+
+    @pytest.fixture(autouse=True)
+    def set_up(self):
+        self.consumer = NatsConsumer(
+            concurrency=2, nak_delay=1, max_nak_delay=4, max_deliver=5
+        )
+
+    def test_decodes_dicts_and_strings(self):
+        assert decode(b'{"email": "a@gmail.com"}') == {"email": "a@gmail.com"}
+        assert decode(b"test") == "test"
+        assert decode(b"1") == "1"
+
+    async def test_acks_handled_messages(self):
+        handled = []
+
+        @self.consumer.handler("event")
+        async def handler(payload: Payload):
+            handled.append(payload)
+
+        messages = [FakeMsg("event", str(i)) for i in range(5)]
+        await self.consumer.handle_batch("event", messages)  # type: ignore
+
+        assert sorted(handled) == ["0", "1", "2", "3", "4"]
+        assert all(msg.acked for msg in messages)
+
+    async def test_keeps_order_per_key(self):
+        handled = []
+
+        @self.consumer.handler("event", key=lambda payload: payload["email"])
+        async def handler(payload: Payload):
+            await asyncio.sleep(0.01 if payload["n"] == 0 else 0)
+            handled.append(payload["n"])
+
+        messages = [
+            FakeMsg("event", {"email": "a@gmail.com", "n": 0}),
+            FakeMsg("event", {"email": "a@gmail.com", "n": 1}),
+        ]
+        await self.consumer.handle_batch("event", messages)  # type: ignore
+
+        assert handled == [0, 1]
+
+    async def test_limits_concurrent_handlers(self):
+        running = 0
+        peak = 0
+
+        @self.consumer.handler("event")
+        async def handler(payload: Payload):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+
+        messages = [FakeMsg("event", str(i)) for i in range(10)]
+        await self.consumer.handle_batch("event", messages)  # type: ignore
+
+        assert peak == 2
+
+    async def test_naks_failed_message_and_the_ones_behind_it(self):
+        @self.consumer.handler("event", key=lambda payload: payload["email"])
+        async def handler(payload: Payload):
+            if payload["n"] == 1:
+                raise Exception("down")
+
+        messages = [
+            FakeMsg("event", {"email": "a@gmail.com", "n": n}) for n in range(3)
+        ] + [FakeMsg("event", {"email": "b@gmail.com", "n": 3})]
+        await self.consumer.handle_batch("event", messages)  # type: ignore
+
+        assert [msg.acked for msg in messages] == [True, False, False, True]
+        assert [msg.naked for msg in messages] == [False, True, True, False]
+
+    async def test_nak_delay_backs_off_per_delivery(self):
+        @self.consumer.handler("event")
+        async def handler(payload: Payload):
+            raise Exception("down")
+
+        messages = [FakeMsg("event", str(n), delivered=n) for n in range(1, 5)]
+        await self.consumer.handle_batch("event", messages)  # type: ignore
+
+        assert [msg.nak_delay for msg in messages] == [1, 2, 4, 4]
+
+    async def test_terminates_message_failing_max_deliver_times(self):
+        @self.consumer.handler("event", key=lambda payload: payload["email"])
+        async def handler(payload: Payload):
+            if payload["n"] == 0:
+                raise Exception("down")
+
+        messages = [
+            FakeMsg("event", {"email": "a@gmail.com", "n": 0}, delivered=5),
+            FakeMsg("event", {"email": "a@gmail.com", "n": 1}),
+        ]
+        await self.consumer.handle_batch("event", messages)  # type: ignore
+
+        assert [msg.termed for msg in messages] == [True, False]
+        assert [msg.naked for msg in messages] == [False, True]
+
+    async def test_terminates_unreadable_messages_and_handles_the_rest(self):
+        handled = []
+
+        @self.consumer.handler("event", key=lambda payload: payload["email"])
+        async def handler(payload: Payload):
+            handled.append(payload["email"])
+
+        messages = [
+            FakeMsg("event", "not a dict"),
+            FakeMsg("event", {"email": "a@gmail.com"}),
+        ]
+        messages[0].data = b"\xff"
+        await self.consumer.handle_batch("event", messages)  # type: ignore
+
+        assert handled == ["a@gmail.com"]
+        assert (messages[0].termed, messages[1].acked) == (True, True)
+
+    async def test_failing_subject_restarts_without_stopping_others(self, monkeypatch):
+        # the package exports the handlers' consumer under the module's name
+        monkeypatch.setattr(sys.modules[NatsConsumer.__module__], "RESTART_DELAY", 0)
+        self.consumer._stopping = asyncio.Event()
+        consumed = []
+
+        async def consume(nc, js, subject: str):
+            consumed.append(subject)
+            if len(consumed) == 1:
+                raise ConnectionError()
+            self.consumer.stop()
+
+        self.consumer._consume = consume  # type: ignore
+        await self.consumer._consume_forever(None, None, "event")  # type: ignore
+
+        assert consumed == ["event", "event"]
+
+    async def test_adds_missing_subjects_to_existing_stream(self):
+        @self.consumer.handler("event")
+        async def handler(payload: Payload):
+            pass
+
+        updated = []
+        info = SimpleNamespace(config=StreamConfig(name="events", subjects=["other"]))
+
+        async def stream_info(name: str):
+            return info
+
+        async def update_stream(config: StreamConfig):
+            updated.append(config.subjects)
+
+        js = SimpleNamespace(stream_info=stream_info, update_stream=update_stream)
+        await self.consumer._ensure_stream(js)  # type: ignore
+        await self.consumer._ensure_stream(js)  # type: ignore
+
+        assert updated == [["other", "event"]]
@@ -0,0 +1,49 @@
+import pytest
+
+from app.services.codec import Codec
+
+VALUE = {"v": ["email@gmail.com"] * 100, "d": 0.01, "e": None}
+
+
+class TestCodec:
+    def test_roundtrips_value(self):
+        codec = Codec()
+
+        assert codec.decode(codec.encode(VALUE)) == VALUE
+
+    def test_header_names_serializer_and_compression(self):
+        data = Codec("json").encode(VALUE)
+
+        assert data[0] == 0x00
+        assert data[1:].startswith(b"{")
+
+    def test_unknown_header_raises(self):
+        with pytest.raises(ValueError):
+            Codec().decode(b"\xff{}")
+
+    def test_empty_value_raises(self):
+        with pytest.raises(ValueError):
+            Codec().decode(b"")
+
+    @pytest.mark.parametrize("serializer", ["orjson", "msgpack"])
+    def test_other_serializers_roundtrip(self, serializer: str):
+        pytest.importorskip(serializer)
+        codec = Codec(serializer)  # type: ignore
+
+        assert codec.decode(codec.encode(VALUE)) == VALUE
+        # values written before the serializer changed still decode
+        assert codec.decode(Codec("json").encode(VALUE)) == VALUE
+
+    @pytest.mark.parametrize(
+        "compression, module", [("zstd", "zstandard"), ("lz4", "lz4")]
+    )
+    def test_compresses_values_above_threshold(self, compression: str, module: str):
+        pytest.importorskip(module)
+        codec = Codec("json", compression, threshold=100)  # type: ignore
+
+        small, large = codec.encode([1]), codec.encode(VALUE)
+
+        assert small[0] & 0x0F == 0
+        assert large[0] & 0x0F != 0
+        assert len(large) < len(Codec().encode(VALUE))
+        assert codec.decode(large) == VALUE
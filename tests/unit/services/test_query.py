@@ -1,11 +1,16 @@
 import asyncio
+import time
+from inspect import signature
 
 import pytest
 
+from app.config import config
 from app.domain import models
 from app.infra.memory.cache import InMemoryCache
 from app.infra.memory.publisher import InMemoryEventPublisher
 from app.infra.sqlalchemy.query import SqlAlchemyQuery, SqlConnection
+from app.services.errors import ValidationError
+from app.services.ports import cached
 from tests.unit.services.test_uow import SqlAlchemyUowImpl
 
 
@@ -13,6 +18,29 @@ class SqlAlchemyQueryImpl(SqlAlchemyQuery):
     pass
 
 
+class ViewQuery(SqlAlchemyQuery):
+    @cached(ttl=3600, key=lambda email: email)
+    async def user_domain(self, *, email: str) -> str:
+        return email.split("@")[1]
+
+    @cached()
+    async def echo(self, *, value: str) -> str:
+        return value
+
+    @cached(ttl=0)
+    async def volatile(self, *, value: str) -> str:
+        return value
+
+
+class CountingQuery(SqlAlchemyQuery):
+    calls = 0
+
+    async def list_users(self, *, skip: int = 0, limit: int = 50):
+        self.calls += 1
+        await asyncio.sleep(0.05)  # keep the recompute in flight
+        return await super().list_users(skip=skip, limit=limit)
+
+
 class TestQuery:
     cache: InMemoryCache
     query: SqlAlchemyQueryImpl
@@ -22,9 +50,10 @@ class TestQuery:
         # create database tables
         connection = SqlConnection()
         await connection.connect()
+        self.connection = connection
         self.cache = InMemoryCache()
         self.query = SqlAlchemyQueryImpl(connection, self.cache)
-        self.uow = SqlAlchemyUowImpl(connection, InMemoryEventPublisher())
+        self.uow = SqlAlchemyUowImpl(connection, InMemoryEventPublisher(), self.cache)
         await self._seed_model()
 
         yield
@@ -32,15 +61,12 @@ class TestQuery:
         await connection.close(cleanup=True)
 
     async def test_marked_method_results_are_cached(self):
-        res = await self.cache.get(
-            f"{self.query._cache_key_prefix}:list_users:skip:<default>:limit:<default>"
-        )
+        key = f"{self.query._cache_key_prefix}:list_users:limit=50,skip=0:tags:user=1"
+        res = await self.cache.get(key)
         assert res is None
 
         await self.query.list_users()
-        res = await self.cache.get(
-            f"{self.query._cache_key_prefix}:list_users:skip:<default>:limit:<default>"
-        )
+        res = await self.cache.get(key)
 
         assert res is not None
 
@@ -48,15 +74,34 @@ class TestQuery:
         res = await self.query.list_users()
         assert res is not None
 
-        # invalidate the cache
-        async with self.uow:
-            await self.uow.user_repository.add(models.User(email="emailfour@gmail.com"))
-            await self.uow.commit()
+        await self._add_out_of_band(models.User(email="emailfour@gmail.com"))
 
         res = await self.query.list_users()  # returning cached (stale) data still
         assert res is not None
         assert len(res) == 3
 
+    async def test_commit_invalidates_tagged_methods(self):
+        self.query._ttl = 3600
+        assert len(await self.query.list_users()) == 3
+        page = await self.query.list_users_after(limit=10)
+        assert len(page["users"]) == 3
+
+        async with self.uow:
+            await self.uow.user_repository.add(models.User(email="emailfour@gmail.com"))
+            await self.uow.commit()
+
+        assert len(await self.query.list_users()) == 4
+        page = await self.query.list_users_after(limit=10)
+        assert len(page["users"]) == 4
+
+    async def test_rolled_back_uow_keeps_cache(self):
+        await self.query.list_users()
+
+        async with self.uow:
+            await self.uow.user_repository.add(models.User(email="emailfour@gmail.com"))
+
+        assert await self.cache.tag_versions(["user"]) == [1]
+
     async def test_marked_methods_caches_expire_and_will_repopulate(self):
         self.query._ttl = 1  # specify a short ttl so cache will refresh
 
@@ -73,6 +118,180 @@ class TestQuery:
         res = await self.query.list_users()
         assert len(res) == 4  # returning the newly entered item because cache expired
 
+    async def test_defaults_and_explicit_arguments_share_a_key(self):
+        await self.query.list_users()
+        await self.query.list_users(limit=50, skip=0)
+
+        assert self.query.cache_stats["list_users"] == {"hits": 1, "misses": 1}
+
+    async def test_new_query_methods_can_be_cached(self):
+        query = ViewQuery(self.connection, self.cache)
+
+        assert await query.user_domain(email="email@gmail.com") == "gmail.com"
+        assert await query.user_domain(email="email@gmail.com") == "gmail.com"
+
+        key = f"{query._cache_key_prefix}:user_domain:email@gmail.com:tags:"
+        assert await self.cache.get_value(key) is not None
+        assert query.cache_stats["user_domain"] == {"hits": 1, "misses": 1}
+        # overrides of port methods keep the port options
+        assert query._cached_methods["list_users"]["tags"] == ["user"]
+
+    async def test_long_arguments_are_hashed_in_keys(self):
+        query = ViewQuery(self.connection, self.cache)
+
+        await query.echo(value="x" * 1000)
+
+        key = next(key for key in self.cache.store if ":echo:" in key)
+        assert len(key) < 100
+        assert key.startswith(f"{query._cache_key_prefix}:echo:value=#")
+
+    async def test_expired_entries_are_served_stale_while_refreshing(self):
+        self.query._ttl = 1
+
+        assert len(await self.query.list_users()) == 3
+        await self._add_out_of_band(models.User(email="emailfour@gmail.com"))
+        await asyncio.sleep(1)
+
+        res = await self.query.list_users()
+        assert len(res) == 3  # stale, refresh is in flight
+        await asyncio.gather(*self.query._refreshing.values())
+
+        res = await self.query.list_users()
+        assert len(res) == 4
+
+    async def test_entries_refresh_early_near_expiry(self, monkeypatch):
+        # large beta makes the early refresh certain
+        monkeypatch.setattr(config, "CACHE_EARLY_REFRESH_BETA", 1e12)
+        self.query._ttl = 3600
+
+        assert len(await self.query.list_users()) == 3
+        await self._add_out_of_band(models.User(email="emailfour@gmail.com"))
+
+        assert len(await self.query.list_users()) == 3
+        await asyncio.gather(*self.query._refreshing.values())
+        assert len(await self.query.list_users()) == 4
+
+    async def test_misses_during_a_refresh_get_the_value(self, monkeypatch):
+        monkeypatch.setattr(config, "CACHE_EARLY_REFRESH_BETA", 1e12)
+        query = CountingQuery(self.connection, self.cache)
+        query._ttl = 3600
+
+        await query.list_users()
+        await query.list_users()  # refreshes in the background
+        assert query._refreshing
+        key = next(key for key in self.cache.store if ":list_users:" in key)
+        await self.cache.delete(key)
+
+        assert len(await query.list_users()) == 3
+        await asyncio.gather(*query._refreshing.values())
+
+    async def test_zero_ttl_is_not_replaced_by_the_default(self):
+        query = ViewQuery(self.connection, self.cache)
+        query._ttl = 3600
+
+        await query.volatile(value="x")
+
+        key = next(key for key in self.cache.store if ":volatile:" in key)
+        entry = await self.cache.get_value(key)
+        assert entry is not None and entry["e"] <= time.time()
+
+    async def test_fresh_entries_are_not_refreshed(self, monkeypatch):
+        monkeypatch.setattr(config, "CACHE_EARLY_REFRESH_BETA", 0)
+        self.query._ttl = 3600
+
+        await self.query.list_users()
+        await self.query.list_users()
+
+        assert self.query._refreshing == {}
+
+    async def test_each_marked_method_is_cached_separately(self):
+        users = await self.query.list_users()
+        page = await self.query.list_users_after(limit=2)
+
+        assert len(users) == 3
+        assert page["users"] == ["email@gmail.com", "emailtwo@gmail.com"]
+
+    async def test_cursor_pages_cover_all_rows(self):
+        page = await self.query.list_users_after(limit=2)
+        assert page["users"] == ["email@gmail.com", "emailtwo@gmail.com"]
+        assert page["next_cursor"] is not None
+
+        page = await self.query.list_users_after(after=page["next_cursor"], limit=2)
+        assert page["users"] == ["emailthree@gmail.com"]
+        assert page["next_cursor"] is None
+
+    async def test_invalid_cursor_raises_validation_error(self):
+        with pytest.raises(ValidationError):
+            await self.query.list_users_after(after="not-a-cursor")
+
+    async def test_stream_returns_all_rows_in_chunks(self):
+        chunks = [chunk async for chunk in self.query.stream_users(chunk_size=2)]
+
+        assert chunks == [
+            ["email@gmail.com", "emailtwo@gmail.com"],
+            ["emailthree@gmail.com"],
+        ]
+
+    async def test_stream_is_not_cached(self):
+        [chunk async for chunk in self.query.stream_users()]
+
+        assert not any(
+            key.startswith(self.query._cache_key_prefix) for key in self.cache.store
+        )
+
+    async def test_concurrent_misses_recompute_once(self):
+        query = CountingQuery(self.connection, self.cache)
+
+        results = await asyncio.gather(*(query.list_users() for _ in range(10)))
+
+        assert query.calls == 1
+        assert all(len(res) == 3 for res in results)
+        assert query._in_flight == {}
+
+    async def test_cancelled_caller_does_not_cancel_recompute(self):
+        query = CountingQuery(self.connection, self.cache)
+
+        first = asyncio.create_task(query.list_users())
+        second = asyncio.create_task(query.list_users())
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert len(await second) == 3
+        assert query.calls == 1
+
+    async def test_lock_lets_one_instance_recompute(self, monkeypatch):
+        monkeypatch.setattr(config, "CACHE_LOCK", True)
+        # two pods sharing the same cache
+        pods = [CountingQuery(self.connection, self.cache) for _ in range(2)]
+
+        results = await asyncio.gather(*(pod.list_users() for pod in pods))
+
+        assert sum(pod.calls for pod in pods) == 1
+        assert all(len(res) == 3 for res in results)
+        assert not any(key.endswith(":lock") for key in self.cache.store)
+
+    async def test_lock_waiter_recomputes_after_timeout(self, monkeypatch):
+        monkeypatch.setattr(config, "CACHE_LOCK", True)
+        monkeypatch.setattr(config, "CACHE_LOCK_TIMEOUT", 0.1)
+        query = CountingQuery(self.connection, self.cache)
+        key = await query._cache_key(
+            "list_users",
+            signature(query.list_users),
+            query._cached_methods["list_users"],
+            (),
+            {},
+        )
+        # a lock held by a pod that never finishes
+        assert await self.cache.acquire_lock(f"{key}:lock", 10) is not None
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        res = await query.list_users()
+
+        assert loop.time() - start >= config.CACHE_LOCK_TIMEOUT
+        assert len(res) == 3
+        assert query.calls == 1
+
     async def _seed_model(self):
         async with self.uow:
             await self.uow.user_repository.add(models.User(email="email@gmail.com"))
@@ -81,3 +300,12 @@ class TestQuery:
                 models.User(email="emailthree@gmail.com")
             )
             await self.uow.commit()
+
+    async def _add_out_of_band(self, user: models.User):
+        # write through a uow that doesn't share the query cache
+        uow = SqlAlchemyUowImpl(
+            self.connection, InMemoryEventPublisher(), InMemoryCache()
+        )
+        async with uow:
+            await uow.user_repository.add(user)
+            await uow.commit()
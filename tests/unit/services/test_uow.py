@@ -1,3 +1,4 @@
+import asyncio
 from typing import cast
 
 import pytest
@@ -5,12 +6,19 @@ from sqlalchemy.future import select
 
 from app.domain import models
 from app.domain.models.user import DomainEvent
+from app.infra.memory.cache import InMemoryCache
+from app.infra.memory.metrics import InMemoryMetrics
 from app.infra.memory.publisher import InMemoryEventPublisher
+from app.infra.sqlalchemy.outbox import SqlAlchemyOutboxRelay
+from app.infra.sqlalchemy.tables import outbox
 from app.infra.sqlalchemy.uow import (
     SqlAlchemyUow,
     SqlAlchemyUserRepository,
     SqlConnection,
 )
+from app.services.dispatcher import EventDispatcher
+from app.services.errors import ServiceUnavailableException
+from app.services.ports import OutboxRelay
 
 
 class SqlAlchemyUserRepositoryImpl(SqlAlchemyUserRepository):
@@ -29,6 +37,9 @@ class SqlAlchemyUserRepositoryImpl(SqlAlchemyUserRepository):
 
         return users
 
+    async def add_all(self, users: list[models.User]):
+        self.session.add_all(users)
+
 
 class SqlAlchemyUowImpl(SqlAlchemyUow):
     user_repository: SqlAlchemyUserRepositoryImpl
@@ -82,6 +93,21 @@ class TestRepository:
             await self.uow.user_repository.add(user)
             assert set([user]) == self.uow.user_repository.seen
 
+    async def test_add_methods_with_list_of_aggregates_have_objects_added_to_seen(
+        self,
+    ):
+        async with self.uow:
+            users = [models.User(email=f"email{i}@gmail.com") for i in range(2)]
+            await self.uow.user_repository.add_all(users=users)
+            assert set(users) == self.uow.user_repository.seen
+
+    async def test_methods_are_decorated_once_per_class(self):
+        async with self.uow:
+            repository = self.uow.user_repository
+            assert "add" not in vars(repository)
+            assert repository.add.__func__ is SqlAlchemyUserRepositoryImpl.add
+            assert getattr(SqlAlchemyUserRepositoryImpl.add_all, "__seen_decorated__")
+
     async def _seed_model(self, email: str = "email@gmail.com"):
         async with self.uow:
             user = models.User(email=email)
@@ -267,3 +293,228 @@ class TestUow:
             user = models.User(email=email)
             await self.uow.user_repository.add(user)
             await self.uow.commit()
+
+
+class TestEventDispatch:
+    connection: SqlConnection
+    publisher: InMemoryEventPublisher
+
+    @pytest.fixture(autouse=True)
+    async def set_up(self):
+        # create database tables
+        self.connection = SqlConnection()
+        await self.connection.connect()
+        self.publisher = InMemoryEventPublisher()
+
+        yield
+
+        await self.connection.close(cleanup=True)
+
+    async def test_events_are_not_published_when_commit_fails(self, mocker):
+        uow = SqlAlchemyUowImpl(self.connection, self.publisher)
+        async with uow:
+            mocker.patch.object(uow._session, "commit", side_effect=Exception("down"))
+            await self._add_users_with_events(uow, 1)
+
+            with pytest.raises(Exception):
+                await uow.commit()
+
+        assert self.publisher.published_messages == []
+
+    async def test_inline_concurrent_dispatch_publishes_every_event(self):
+        uow = SqlAlchemyUowImpl(
+            self.connection, self.publisher, dispatch="inline-concurrent"
+        )
+        async with uow:
+            await self._add_users_with_events(uow, 3)
+            await uow.commit()
+
+            assert len(self.publisher.published_messages) == 3
+
+    async def test_background_dispatch_publishes_on_flush(self):
+        uow = SqlAlchemyUowImpl(self.connection, self.publisher, dispatch="background")
+        async with uow:
+            await self._add_users_with_events(uow, 3)
+            await uow.commit()
+
+        await EventDispatcher.flush()
+
+        assert len(self.publisher.published_messages) == 3
+
+    async def test_background_dispatch_failures_do_not_raise(self, mocker):
+        mocker.patch.object(self.publisher, "publish", side_effect=Exception("down"))
+        uow = SqlAlchemyUowImpl(self.connection, self.publisher, dispatch="background")
+        async with uow:
+            await self._add_users_with_events(uow, 1)
+            await uow.commit()
+
+        await EventDispatcher.flush()
+
+    async def test_background_dispatch_waits_for_room(self, mocker):
+        available = asyncio.Event()
+
+        async def stalled(events):
+            await available.wait()
+
+        mocker.patch.object(self.publisher, "publish_many", side_effect=stalled)
+        dispatcher = EventDispatcher(self.publisher, "background", max_in_flight=2)
+        events = [DomainEvent(f"email{i}@gmail.com") for i in range(3)]
+
+        await dispatcher.dispatch(events[:2])
+        waiting = asyncio.create_task(dispatcher.dispatch(events[2:]))
+        await asyncio.sleep(0.01)
+
+        assert not waiting.done()
+        assert sum(EventDispatcher._background_tasks.values()) == 2
+        available.set()
+        await asyncio.wait_for(waiting, 1)
+        await EventDispatcher.flush()
+
+    async def test_cache_failures_do_not_fail_commit_or_drop_events(self, mocker):
+        cache = InMemoryCache()
+        metrics = InMemoryMetrics()
+        mocker.patch.object(cache, "incr", side_effect=Exception("down"))
+        uow = SqlAlchemyUowImpl(self.connection, self.publisher, cache, metrics)
+        async with uow:
+            await self._add_users_with_events(uow, 1)
+            await uow.commit()
+
+        assert len(self.publisher.published_messages) == 1
+        errors = metrics.key("uow_cache_invalidation_errors_total")
+        assert metrics.counters[errors] == 1
+
+    async def test_backed_up_publisher_does_not_fail_commit(self, mocker):
+        metrics = InMemoryMetrics()
+        mocker.patch.object(
+            self.publisher,
+            "publish",
+            side_effect=ServiceUnavailableException("backed up"),
+        )
+        uow = SqlAlchemyUowImpl(
+            self.connection, self.publisher, InMemoryCache(), metrics
+        )
+        async with uow:
+            await self._add_users_with_events(uow, 2)
+            await uow.commit()
+
+        async with uow:
+            assert len(await uow.user_repository.find_many(["email0@gmail.com"])) == 1
+        dropped = metrics.key("uow_dropped_events_total")
+        assert metrics.counters[dropped] == 2
+
+    async def _add_users_with_events(self, uow: SqlAlchemyUowImpl, count: int):
+        for i in range(count):
+            user = models.User(email=f"email{i}@gmail.com")
+            await uow.user_repository.add(user)
+            user.some_domain_method()
+
+
+class TestOutbox:
+    connection: SqlConnection
+    uow: SqlAlchemyUowImpl
+    publisher: InMemoryEventPublisher
+    relay: SqlAlchemyOutboxRelay
+
+    @pytest.fixture(autouse=True)
+    async def set_up(self):
+        # create database tables
+        self.connection = SqlConnection()
+        await self.connection.connect()
+        self.publisher = InMemoryEventPublisher()
+        self.uow = SqlAlchemyUowImpl(self.connection, self.publisher, outbox=True)
+        self.relay = SqlAlchemyOutboxRelay(self.connection, self.publisher)
+
+        yield
+
+        await self.connection.close(cleanup=True)
+
+    async def test_domain_events_are_stored_in_outbox_on_commit(self):
+        await self._seed_model_with_event()
+
+        assert self.publisher.published_messages == []
+        assert await self._count_outbox() == 1
+
+    async def test_outbox_is_not_written_on_rollback(self):
+        async with self.uow:
+            user = models.User(email="email@gmail.com")
+            await self.uow.user_repository.add(user)
+            user.some_domain_method()
+
+        assert await self._count_outbox() == 0
+
+    async def test_relay_publishes_and_drains_outbox(self):
+        await self._seed_model_with_event("email@gmail.com")
+        await self._seed_model_with_event("another_email@gmail.com")
+
+        relayed = await self.relay.relay()
+
+        assert relayed == 2
+        assert await self._count_outbox() == 0
+        assert self.publisher.published_messages == [
+            {
+                "channel": "DomainThingHappened",
+                "payload": {"email": "email@gmail.com"},
+            },
+            {
+                "channel": "DomainThingHappened",
+                "payload": {"email": "another_email@gmail.com"},
+            },
+        ]
+
+    async def test_relay_publishes_in_batches(self):
+        for i in range(3):
+            await self._seed_model_with_event(f"email{i}@gmail.com")
+
+        assert await self.relay.relay(batch_size=2) == 2
+        assert await self.relay.relay(batch_size=2) == 1
+        assert await self.relay.relay(batch_size=2) == 0
+        assert len(self.publisher.published_messages) == 3
+
+    async def test_events_stay_in_outbox_when_publish_fails(self, mocker):
+        await self._seed_model_with_event()
+        mocker.patch.object(self.publisher, "publish", side_effect=Exception("down"))
+
+        with pytest.raises(Exception):
+            await self.relay.relay()
+
+        assert await self._count_outbox() == 1
+
+    async def _count_outbox(self) -> int:
+        async with self.relay.session_factory() as session:
+            res = await session.execute(select(outbox))
+            return len(res.all())
+
+    async def _seed_model_with_event(self, email: str = "email@gmail.com"):
+        async with self.uow:
+            user = models.User(email=email)
+            await self.uow.user_repository.add(user)
+            user.some_domain_method()
+            await self.uow.commit()
+
+
+class FlakyOutboxRelay(OutboxRelay):
+    def __init__(self):
+        super().__init__(InMemoryEventPublisher(), InMemoryMetrics())
+        self.calls = 0
+        self.recovered = asyncio.Event()
+
+    async def relay(self, batch_size: int = 500) -> int:
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("down")
+        self.recovered.set()
+        return 0
+
+
+class TestOutboxRelayRun:
+    async def test_run_survives_a_failed_relay(self):
+        relay = FlakyOutboxRelay()
+
+        task = asyncio.create_task(relay.run(interval=0.01))
+        await asyncio.wait_for(relay.recovered.wait(), 1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert relay.calls >= 2
+        metrics = cast(InMemoryMetrics, relay._metrics)
+        assert metrics.counters[metrics.key("outbox_relay_errors_total")] == 1
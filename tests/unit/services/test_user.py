@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.domain import models
+from app.infra.memory.bloom import InMemoryBloomFilter
+from app.infra.memory.cache import InMemoryCache
+from app.infra.memory.publisher import InMemoryEventPublisher
+from app.infra.sqlalchemy.query import SqlAlchemyQuery
+from app.infra.sqlalchemy.uow import SqlAlchemyUow, SqlConnection
+from app.services.errors import ResourceExistsException
+from app.services.user import UserCrudService, UserEmailFilterService, dtos
+
+
+class TestUserCrudService:
+    service: UserCrudService
+
+    @pytest.fixture(autouse=True)
+    async def set_up(self):
+        # create database tables
+        connection = self.connection = SqlConnection()
+        await connection.connect()
+        self.emails = InMemoryBloomFilter(capacity=10_000)
+        self.service = UserCrudService(
+            SqlAlchemyUow(connection, InMemoryEventPublisher(), emails=self.emails),
+            self.emails,
+        )
+        self.loader = UserEmailFilterService(
+            SqlAlchemyQuery(connection, InMemoryCache()), self.emails
+        )
+        await self.service.create_user(dtos.CreateUser(email="email@gmail.com"))
+
+        yield
+
+        await connection.close(cleanup=True)
+
+    async def test_create_user_raises_if_user_exists(self):
+        with pytest.raises(ResourceExistsException):
+            await self.service.create_user(dtos.CreateUser(email="email@gmail.com"))
+
+    async def test_create_users_returns_result_per_item(self):
+        results = await self.service.create_users(
+            dtos.CreateUsers(
+                users=[
+                    dtos.CreateUser(email="email@gmail.com"),
+                    dtos.CreateUser(email="another_email@gmail.com"),
+                    dtos.CreateUser(email="another_email@gmail.com"),
+                ]
+            )
+        )
+
+        assert results == [
+            dtos.CreatedUser(email="email@gmail.com", created=False),
+            dtos.CreatedUser(email="another_email@gmail.com", created=True),
+            dtos.CreatedUser(email="another_email@gmail.com", created=False),
+        ]
+
+    async def test_create_users_persists_new_users(self):
+        emails = [f"email{i}@gmail.com" for i in range(1_000)]
+        await self.service.create_users(
+            dtos.CreateUsers(users=[dtos.CreateUser(email=email) for email in emails])
+        )
+
+        async with self.service.uow:
+            existing = await self.service.uow.user_repository.exists_many(emails)
+            assert existing == set(emails)
+
+    async def test_load_adds_existing_emails_to_filter(self):
+        assert await self.emails.is_loaded() is False
+
+        await self.loader.load()
+
+        assert await self.emails.is_loaded() is True
+        assert await self.emails.might_contain("email@gmail.com") is True
+
+    async def test_created_users_are_added_to_filter(self):
+        await self.loader.load()
+
+        await self.service.create_user(dtos.CreateUser(email="new@gmail.com"))
+        await self.service.create_users(
+            dtos.CreateUsers(users=[dtos.CreateUser(email="batch@gmail.com")])
+        )
+
+        assert await self.emails.might_contain_many(
+            ["new@gmail.com", "batch@gmail.com"]
+        ) == [True, True]
+
+    async def test_create_user_raises_if_filter_misses_existing_user(self):
+        await self.loader.load()
+        # added by a pod whose filter isn't shared
+        elsewhere = SqlAlchemyUow(
+            self.connection,
+            InMemoryEventPublisher(),
+            emails=InMemoryBloomFilter(capacity=10_000),
+        )
+        async with elsewhere:
+            await elsewhere.user_repository.add(
+                models.User(email="elsewhere@gmail.com")
+            )
+            await elsewhere.commit()
+
+        assert await self.emails.might_contain("elsewhere@gmail.com") is False
+        with pytest.raises(ResourceExistsException):
+            await self.service.create_user(dtos.CreateUser(email="elsewhere@gmail.com"))
+
+    async def test_users_committed_through_uow_are_added_to_filter(self):
+        await self.loader.load()
+
+        async with self.service.uow:
+            await self.service.uow.user_repository.add(
+                models.User(email="uow@gmail.com")
+            )
+            await self.service.uow.commit()
+
+        assert await self.emails.might_contain("uow@gmail.com") is True
+
+    async def test_commit_only_maps_unique_violations(self):
+        async with self.service.uow:
+            await self.service.uow.user_repository.add(models.User(email=None))  # type: ignore
+            with pytest.raises(IntegrityError):
+                await self.service.uow.commit()
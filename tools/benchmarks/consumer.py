@@ -0,0 +1,70 @@
+"""Throughput of the NATS consumer entrypoint at a few concurrency limits
+
+Needs a server started with `nats-server -js`, handlers sleep to stand in for io
+Run from the project root: PYTHONPATH=. python tools/benchmarks/consumer.py
+"""
+
+import asyncio
+import time
+
+from app.domain.event import Payload
+from app.entrypoints.brokers.nats.consumer import NatsConsumer
+from app.infra.nats.jetstream import JetStreamEventPublisher
+from app.infra.nats.publisher import NatsConnection
+from app.services.ports.publisher import Events
+
+EVENTS = 20_000
+HANDLER_LATENCY = 0.001
+STREAM = "benchmark"
+SUBJECT = f"{STREAM}.user"
+
+
+def report(name: str, elapsed: float):
+    print(f"{name:<28} {EVENTS / elapsed:10.0f} events/s")
+
+
+async def consume(connection: NatsConnection, concurrency: int) -> float:
+    consumer = NatsConsumer(
+        stream=STREAM, durable=f"benchmark_{concurrency}", concurrency=concurrency
+    )
+    handled = 0
+    done = asyncio.Event()
+
+    @consumer.handler(SUBJECT, key=lambda payload: payload["id"] % 100)
+    async def handler(payload: Payload):
+        nonlocal handled
+        await asyncio.sleep(HANDLER_LATENCY)
+        handled += 1
+        if handled == EVENTS:
+            done.set()
+
+    start = time.perf_counter()
+    task = asyncio.create_task(consumer.run(connection.nc))
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    consumer.stop()
+    await task
+    return elapsed
+
+
+async def main():
+    connection = NatsConnection()
+    await connection.connect()
+    js = connection.nc.jetstream()
+    await js.add_stream(name=STREAM, subjects=[f"{STREAM}.>"])
+
+    await JetStreamEventPublisher(connection).publish_many(
+        [Events(channel=SUBJECT, payload={"id": i}) for i in range(EVENTS)]
+    )
+
+    # every durable consumer reads the stream from the start
+    for concurrency in (1, 16, 64, 256):
+        report(f"concurrency={concurrency}", await consume(connection, concurrency))
+
+    await js.delete_stream(STREAM)
+    await connection.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""Throughput of publishing domain events to NATS, core and JetStream
+
+Needs a server started with `nats-server -js`
+Run from the project root: PYTHONPATH=. python tools/benchmarks/publisher.py
+"""
+
+import asyncio
+import time
+
+from app.infra.nats.jetstream import JetStreamEventPublisher
+from app.infra.nats.publisher import NatsConnection, NatsEventPublisher
+from app.services.ports.publisher import Events, Publisher
+
+EVENTS = 20_000
+STREAM = "benchmark"
+
+
+def report(name: str, elapsed: float):
+    print(f"{name:<28} {EVENTS / elapsed:10.0f} events/s")
+
+
+async def publish_one_by_one(publisher: Publisher, events: list[Events]):
+    for event in events:
+        await publisher.publish(event["channel"], event["payload"])
+
+
+async def main():
+    connection = NatsConnection()
+    await connection.connect()
+    js = connection.nc.jetstream()
+    await js.add_stream(name=STREAM, subjects=[f"{STREAM}.>"])
+
+    events = [
+        Events(channel=f"{STREAM}.user", payload={"id": i, "email": f"{i}@gmail.com"})
+        for i in range(EVENTS)
+    ]
+    core = NatsEventPublisher(connection)
+    jetstream = JetStreamEventPublisher(connection)
+
+    for name, publish in [
+        ("core publish()", publish_one_by_one(core, events)),
+        ("core publish_many()", core.publish_many(events)),
+        ("jetstream publish()", publish_one_by_one(jetstream, events)),
+        ("jetstream publish_many()", jetstream.publish_many(events)),
+    ]:
+        start = time.perf_counter()
+        await publish
+        report(name, time.perf_counter() - start)
+
+    await js.delete_stream(STREAM)
+    await connection.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
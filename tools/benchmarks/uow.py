@@ -0,0 +1,55 @@
+"""Microbenchmark of Uow construction and repository decoration overhead
+
+Run from the project root: PYTHONPATH=. python tools/benchmarks/uow.py
+"""
+
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain import models
+from app.infra.memory.publisher import InMemoryEventPublisher
+from app.infra.sqlalchemy.uow import (
+    SqlAlchemyUow,
+    SqlAlchemyUserRepository,
+    SqlConnection,
+)
+
+ITERATIONS = 20_000
+
+
+def report(name: str, elapsed: float):
+    print(f"{name:<28} {elapsed / ITERATIONS * 1e6:8.2f} us/op")
+
+
+async def main():
+    connection = SqlConnection()
+    await connection.connect()
+    publisher = InMemoryEventPublisher()
+    session = AsyncSession(connection.default_engine)
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        SqlAlchemyUow(connection, publisher)
+    report("Uow()", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        SqlAlchemyUserRepository(session)
+    report("UserRepository()", time.perf_counter() - start)
+
+    repository = SqlAlchemyUserRepository(session)
+    users = [models.User(email=f"{i}@gmail.com") for i in range(ITERATIONS)]
+    start = time.perf_counter()
+    for user in users:
+        await repository.add(user)
+    report("UserRepository.add()", time.perf_counter() - start)
+
+    session.expunge_all()
+    await session.close()
+    await connection.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())